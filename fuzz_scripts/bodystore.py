@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Content-addressed store for response bodies.
+# Each distinct body (keyed by sha256) is zlib-compressed and appended once to
+# <root>/bodies.pack; <root>/bodies.idx maps hashes to pack offsets, one JSON
+# line per body. NDJSON records then carry only the hash, the length and a
+# short prefix instead of the full body.
+import functools
+import hashlib
+import json
+import threading
+import zlib
+from pathlib import Path
+
+
+class BodyStore:
+    PREFIX_LEN = 80
+
+    def __init__(self, root: Path, level: int = 6, cache_size: int = 256):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.level = level
+        self.records = 0
+        self.stored = 0
+        self.bytes_in = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+        self._index = {}
+        idx_path = self.root / "bodies.idx"
+        if idx_path.exists():
+            with idx_path.open("r", encoding="utf-8") as fh:
+                for line in fh:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._index[entry["sha256"]] = (entry["offset"], entry["size"])
+        self._pack = (self.root / "bodies.pack").open("a+b")
+        self._idx = idx_path.open("a", encoding="utf-8")
+        # Lazy, cached resolution: a sweep reuses a handful of bodies many times
+        self.get = functools.lru_cache(maxsize=cache_size)(self._load)
+
+    def put(self, body: str) -> str:
+        data = body.encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self.records += 1
+            self.bytes_in += len(data)
+            if sha in self._index:
+                return sha
+            packed = zlib.compress(data, self.level)
+            self._pack.seek(0, 2)
+            offset = self._pack.tell()
+            self._pack.write(packed)
+            self._pack.flush()
+            self._index[sha] = (offset, len(packed))
+            self._idx.write(json.dumps({"sha256": sha, "offset": offset, "size": len(packed)}) + "\n")
+            self._idx.flush()
+            self.stored += 1
+            self.bytes_written += len(packed)
+        return sha
+
+    def _load(self, sha: str) -> str:
+        with self._lock:
+            offset, size = self._index[sha]
+            self._pack.seek(offset)
+            packed = self._pack.read(size)
+        return zlib.decompress(packed).decode("utf-8")
+
+    def compact(self, rec: dict) -> dict:
+        body = rec.pop("body", "") or ""
+        rec["body_sha256"] = self.put(body)
+        rec["body_len"] = len(body)
+        rec["body_prefix"] = body[: self.PREFIX_LEN]
+        return rec
+
+    def expand(self, rec: dict) -> dict:
+        sha = rec.pop("body_sha256", None)
+        if sha is None:
+            return rec
+        rec.pop("body_len", None)
+        rec.pop("body_prefix", None)
+        rec["body"] = self.get(sha)
+        return rec
+
+    def summary(self) -> str:
+        with self._lock:
+            return (f"Body store: {self.stored} new bodies for {self.records} records, "
+                    f"{self.bytes_in} bytes in, {self.bytes_written} bytes written")
+
+    def close(self):
+        with self._lock:
+            self._pack.close()
+            self._idx.close()
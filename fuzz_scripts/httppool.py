@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# Stdlib-only keep-alive HTTP client shared by the fuzzers.
+# Keeps up to `pool_size` idle connections per (scheme, host, port) and reuses
+# them across requests; safe to call from worker threads. Reuse needs a server
+# that keeps connections open: one that answers `Connection: close` (such as
+# the Werkzeug dev server behind the Flask services) gets a new connection per
+# request, counted as closed by the server.
+import http.client
+import threading
+from urllib.parse import urlsplit
+
+
+def format_stats(s) -> str:
+    line = f"HTTP connections: opened {s['opened']}, reused {s['reused']}, stale retries {s['retried']}"
+    if s["closed"]:
+        line += f", closed by server {s['closed']} (no keep-alive)"
+    return line
+
+
+class HTTPPool:
+    def __init__(self, pool_size: int = 8, timeout: float = 15):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.opened = 0
+        self.reused = 0
+        self.retried = 0
+        self.closed = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                return idle.pop(), True
+            self.opened += 1
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=self.timeout), False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method: str, url: str, body=None, headers=None):
+        parts = urlsplit(url)
+        key = (parts.scheme or "http", parts.hostname, parts.port)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        while True:
+            conn, reused = self._acquire(key)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                resp = conn.getresponse()
+                data = resp.read()
+            except (ConnectionError, http.client.BadStatusLine):
+                conn.close()
+                if reused:
+                    # Server dropped an idle keep-alive socket; retry on a fresh one
+                    with self._lock:
+                        self.retried += 1
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+                with self._lock:
+                    self.closed += 1
+            else:
+                self._release(key, conn)
+            return resp.status, data
+
+    def get(self, url: str):
+        return self.request("GET", url)
+
+    def stats(self):
+        with self._lock:
+            return {"opened": self.opened, "reused": self.reused, "retried": self.retried, "closed": self.closed}
+
+    def summary(self) -> str:
+        return format_stats(self.stats())
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# Load test of the /safe and /vuln endpoints of every service in
+# assetnote_fuzzer.py. Each (service, endpoint, payload class) is driven by
+# --concurrency closed-loop clients for --duration seconds (or --requests in
+# total) after a short warm-up; services are measured one after another since
+# they share the database containers. Reports throughput, p50/p95/p99 latency
+# and error rate (no response or HTTP >= 500) for benign and malicious
+# payloads, writes them as JSON, and with --baseline flags regressions.
+#
+#   python loadtest.py --out out/loadtest.json
+#   python loadtest.py --baseline out/loadtest.json --tolerance 0.2
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from assetnote_fuzzer import HOST_SERVICES, INTERNAL_SERVICES
+from httppool import HTTPPool
+
+ENDPOINTS = ("/safe", "/vuln")
+PAYLOADS = {
+    "benign": ["col=name&name=apple"],
+    # Rotated per request: NUL, the ?#\0 trick, a stray backtick, a named placeholder
+    "malicious": ["col=%00&name=apple", "col=%3F%23%00&name=apple", "col=name%60&name=apple",
+                  "col=%3Aname&name=apple"],
+}
+POOL = HTTPPool()
+
+
+def percentile(sorted_xs, p: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_xs:
+        return 0.0
+    return sorted_xs[max(0, math.ceil(p / 100 * len(sorted_xs)) - 1)]
+
+
+def drive(urls, concurrency: int, duration: float, requests: int):
+    # Closed loop: every client sends its next request when the previous one returns
+    latencies, codes = [], {}
+    lock = threading.Lock()
+    sent = [0]
+    deadline = time.perf_counter() + duration
+
+    def client():
+        mine, my_codes = [], {}
+        while True:
+            with lock:
+                if (requests and sent[0] >= requests) or (not requests and time.perf_counter() >= deadline):
+                    break
+                i = sent[0]
+                sent[0] += 1
+            start = time.perf_counter()
+            try:
+                code, _ = POOL.get(urls[i % len(urls)])
+            except Exception:
+                code = 0
+            mine.append(time.perf_counter() - start)
+            my_codes[code] = my_codes.get(code, 0) + 1
+        with lock:
+            latencies.extend(mine)
+            for code, n in my_codes.items():
+                codes[code] = codes.get(code, 0) + n
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        for _ in range(concurrency):
+            ex.submit(client)
+    return latencies, codes, time.perf_counter() - start
+
+
+def measure(base: str, endpoint: str, payloads, concurrency: int, duration: float, requests: int, warmup: int) -> dict:
+    urls = [f"http://{base}{endpoint}?{qs}" for qs in payloads]
+    if warmup:
+        drive(urls, min(concurrency, warmup), 0, warmup)
+    latencies, codes, elapsed = drive(urls, concurrency, duration, requests)
+    latencies.sort()
+    total = len(latencies)
+    errors = sum(n for code, n in codes.items() if code == 0 or code >= 500)
+    return {
+        "requests": total,
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "codes": {str(code): n for code, n in sorted(codes.items())},
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float, slack_ms: float) -> list:
+    # Throughput may drop and latency rise by `tolerance` (plus slack_ms for the
+    # small latencies of fast services); the error rate may rise by 1 point
+    regressions = []
+    for key, cur in results.items():
+        old = baseline.get(key)
+        if not old:
+            continue
+        if cur["rps"] < old["rps"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {old['rps']} -> {cur['rps']} req/s")
+        for p in ("p50_ms", "p95_ms", "p99_ms"):
+            if cur[p] > old[p] * (1 + tolerance) + slack_ms:
+                regressions.append(f"{key}: {p} {old[p]} -> {cur[p]}")
+        if cur["error_rate"] > old["error_rate"] + 0.01:
+            regressions.append(f"{key}: error rate {old['error_rate']} -> {cur['error_rate']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /safe and /vuln of every service")
+    parser.add_argument("--ports", choices=["internal", "host"], default="internal", help="use container-internal or host-exposed ports")
+    parser.add_argument("--service", action="append", default=[], help="restrict to this service (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=16, help="closed-loop clients per measurement")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per (service, endpoint, payload class)")
+    parser.add_argument("--requests", type=int, default=0, help="requests per measurement instead of --duration")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests before each measurement")
+    parser.add_argument("--out", default="/workspace/out/loadtest.json", help="results JSON (usable as a later --baseline)")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative throughput drop / latency increase")
+    parser.add_argument("--slack-ms", type=float, default=2.0, help="allowed absolute latency increase on top of --tolerance")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+    services = INTERNAL_SERVICES if args.ports == "internal" else HOST_SERVICES
+    services = [s for s in services if not args.service or s[0] in args.service]
+    POOL.pool_size = args.concurrency
+    results = {}
+    for svc, port, _, _ in services:
+        for endpoint in ENDPOINTS:
+            for kind, payloads in PAYLOADS.items():
+                key = f"{svc} {endpoint} {kind}"
+                res = results[key] = measure(f"{svc}:{port}", endpoint, payloads, args.concurrency,
+                                             args.duration, args.requests, args.warmup)
+                print(f"{key:<48} {res['rps']:>8.1f} req/s  p50 {res['p50_ms']:>7.2f}  p95 {res['p95_ms']:>7.2f}  "
+                      f"p99 {res['p99_ms']:>7.2f} ms  errors {res['error_rate']:.1%}", flush=True)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    meta = {"date": datetime.now(timezone.utc).isoformat(timespec="seconds"), "concurrency": args.concurrency,
+            "duration": args.duration, "requests": args.requests, "ports": args.ports}
+    out.write_text(json.dumps({"meta": meta, "results": results}, indent=2) + "\n", encoding="utf-8")
+    print(f"Wrote: {out}")
+    print(POOL.summary())
+    if baseline is not None:
+        if baseline.get("meta", {}).get("concurrency") != args.concurrency:
+            print("Note: baseline was measured at a different --concurrency")
+        regressions = compare(results, baseline.get("results", {}), args.tolerance, args.slack_ms)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
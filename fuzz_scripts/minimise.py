@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# Delta-debugging minimiser for payloads that trigger an indicator.
+# Reads assetnote_fuzzer.py (run or mutate) or pymysql_fuzzer.py NDJSON,
+# replays every triggering payload to get its response signature
+# (mutator.signature), then shrinks it with ddmin: the payload is cut into n
+# chunks, every chunk and every complement is sent at once, and the first
+# candidate (in a fixed order) that keeps the signature replaces the payload.
+# Responses are cached per endpoint, so candidates shared between payloads are
+# sent once. The output is one line per (endpoint, signature) with the
+# shortest payload found and the cases it was minimised from.
+#
+#   python minimise.py --ndjson out/assetnote-fuzz.ndjson
+#   python minimise.py --ndjson out/fuzz-pymysql.ndjson --base python-mysql-connector:5000
+import argparse
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import mutator
+from assetnote_fuzzer import HOST_SERVICES, INTERNAL_SERVICES
+from bodystore import BodyStore
+from httppool import HTTPPool
+from report import iter_ndjson
+
+POOL = HTTPPool()
+
+
+class Target:
+    # One endpoint: response cache and in-flight limit
+    def __init__(self, base: str, endpoint: str, prefix: bytes, executor: ThreadPoolExecutor, per_service: int):
+        self.base = base
+        self.endpoint = endpoint
+        self.prefix = prefix  # kept in front of every candidate (pymysql "suffix" variant)
+        self.executor = executor
+        self.slots = threading.Semaphore(per_service)
+        self.cache = {}  # payload -> Future of its signature, so in-flight candidates are shared too
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.hits = 0
+
+    def _fetch(self, payload: bytes) -> str:
+        col = mutator.encode(self.prefix + payload)
+        with self.slots:
+            try:
+                code, body = POOL.get(f"http://{self.base}{self.endpoint}?col={col}&name=apple")
+                body = body.decode(errors="replace")
+            except Exception as e:
+                code, body = 0, str(e)
+        return mutator.signature(code, body, self.prefix + payload)
+
+    def signatures(self, candidates):
+        # Signatures of all candidates; uncached ones are fetched concurrently
+        with self.lock:
+            for c in candidates:
+                if c in self.cache:
+                    self.hits += 1
+                else:
+                    self.cache[c] = self.executor.submit(self._fetch, c)
+                    self.requests += 1
+            futures = [self.cache[c] for c in candidates]
+        return [f.result() for f in futures]
+
+
+def ddmin(target: Target, data: bytes, sig: str) -> bytes:
+    n = 2
+    while len(data) >= 2:
+        size = math.ceil(len(data) / n)
+        starts = range(0, len(data), size)
+        subsets = [data[i:i + size] for i in starts]
+        complements = [data[:i] + data[i + size:] for i in starts] if n > 2 else []
+        candidates = subsets + complements
+        results = target.signatures(candidates)
+        passing = [c for c, s in zip(candidates, results) if s == sig]
+        if passing:
+            best = passing[0]
+            n = 2 if best in subsets else max(n - 1, 2)
+            data = best
+        elif n >= len(data):
+            break
+        else:
+            n = min(n * 2, len(data))
+    return data
+
+
+def triggering(path: Path, base: str, endpoint: str, services, store=None):
+    # (target key, tag, payload bytes, recorded signature) for every case worth
+    # minimising; the recorded signature is None for assetnote indicator cases
+    # and "" for pymysql cases whose body is not available
+    ports = {svc: port for svc, port, _, _ in services}
+    usual = {}
+    for rec in iter_ndjson(path):
+        if "hex" in rec:
+            counts = usual.setdefault(rec["variant"], {})
+            counts[rec["http_code"]] = counts.get(rec["http_code"], 0) + 1
+    # pymysql: cases whose HTTP code differs from the most common one of their variant
+    usual = {variant: max(counts, key=counts.get) for variant, counts in usual.items()}
+    for rec in iter_ndjson(path):
+        if "hex" in rec:
+            if rec["http_code"] != usual[rec["variant"]]:
+                prefix = b"name" if rec["variant"] == "suffix" else b""
+                payload = bytes.fromhex(rec["hex"])
+                if store is not None:
+                    rec = store.expand(rec)
+                recorded = mutator.signature(rec["http_code"], rec["body"], prefix + payload) if "body" in rec else ""
+                yield (base, endpoint, prefix), f"{rec['variant']}_{rec['hex']}", payload, recorded
+        elif rec.get("indicator") and rec["service"] in ports:
+            yield ((f"{rec['service']}:{ports[rec['service']]}", rec["endpoint"], b""), rec["tag"],
+                   mutator.decode(rec["encoded_col"]), None)
+
+
+def minimise(cases, concurrency: int, per_service: int):
+    corpus = {}  # (base, endpoint, signature) -> entry
+    targets = {}
+    stale = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as fetchers:
+        def one(case):
+            key, tag, payload, recorded = case
+            target = targets[key]
+            sig = target.signatures([payload])[0]
+            if recorded is None:
+                stale = "|ok|" in sig  # the indicator is gone
+            else:
+                # pymysql outliers are often 200s among 500s: only a changed
+                # signature means the payload no longer gets its response
+                stale = bool(recorded) and sig != recorded
+            if stale:
+                return key, tag, payload, sig, None
+            return key, tag, payload, sig, ddmin(target, payload, sig)
+
+        for key, _, _, _ in cases:
+            if key not in targets:
+                targets[key] = Target(*key, fetchers, per_service)
+        # Payloads are minimised in parallel too; their candidates share the fetch pool
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as workers:
+            for key, tag, payload, sig, small in workers.map(one, cases):
+                if small is None:
+                    stale += 1
+                    continue
+                base, endpoint, prefix = key
+                entry = corpus.setdefault((base, endpoint, sig), {
+                    "service": base.split(":", 1)[0], "endpoint": endpoint, "signature": sig,
+                    "col": mutator.encode(prefix + small), "length": len(small), "sources": []})
+                if len(small) < entry["length"]:
+                    entry.update(col=mutator.encode(prefix + small), length=len(small))
+                entry["sources"].append({"tag": tag, "length": len(payload)})
+    return list(corpus.values()), targets, stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shrink triggering payloads to minimal ones with the same response signature")
+    parser.add_argument("--ndjson", required=True, help="assetnote_fuzzer.py or pymysql_fuzzer.py NDJSON")
+    parser.add_argument("--out", help="minimal corpus NDJSON (default: <ndjson stem>.minimal.ndjson)")
+    parser.add_argument("--ports", choices=["internal", "host"], default="internal", help="service ports for assetnote records")
+    parser.add_argument("--base", default="python-mysql-connector:5000", help="host:port for pymysql records")
+    parser.add_argument("--endpoint", default="/vuln", help="endpoint for pymysql records")
+    parser.add_argument("--body-store", help="body store the pymysql NDJSON was written with")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight overall")
+    parser.add_argument("--per-service", type=int, default=4, help="requests in flight per endpoint")
+    parser.add_argument("--limit", type=int, default=0, help="minimise at most this many payloads (0 = all)")
+    args = parser.parse_args()
+
+    ndjson = Path(args.ndjson)
+    out = Path(args.out) if args.out else ndjson.with_name(ndjson.stem + ".minimal.ndjson")
+    services = INTERNAL_SERVICES if args.ports == "internal" else HOST_SERVICES
+    POOL.pool_size = args.concurrency
+    store = BodyStore(Path(args.body_store)) if args.body_store else None
+    cases = list(triggering(ndjson, args.base, args.endpoint, services, store))
+    if store is not None:
+        store.close()
+    if args.limit:
+        cases = cases[: args.limit]
+    start = time.perf_counter()
+    corpus, targets, stale = minimise(cases, args.concurrency, args.per_service)
+    elapsed = time.perf_counter() - start
+
+    with out.open("w", encoding="utf-8") as fh:
+        for entry in sorted(corpus, key=lambda e: (e["service"], e["endpoint"], e["length"], e["col"])):
+            fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    before = sum(len(p) for _, _, p, _ in cases)
+    after = sum(e["length"] for e in corpus)
+    requests = sum(t.requests for t in targets.values())
+    hits = sum(t.hits for t in targets.values())
+    print(f"Minimised {len(cases)} payloads ({before} bytes) to {len(corpus)} distinct ones ({after} bytes) "
+          f"in {elapsed:.1f}s: {requests} requests, {hits} cache hits")
+    if stale:
+        print(f"Skipped {stale} payloads that no longer get their recorded response")
+    print(f"Wrote: {out}")
+    print(POOL.summary())
+
+
+if __name__ == "__main__":
+    main()
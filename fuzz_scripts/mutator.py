@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# Feedback-driven payload generation for assetnote_fuzzer.py mutate.
+# Responses are reduced to a signature: status, error class and the error
+# message with the echoed query, quoted text and numbers stripped, so two
+# payloads hitting the same parser path map to the same signature. A corpus
+# per service keeps one payload per signature; payloads that produced a new
+# signature are mutated further (token insertion, splicing, byte flips,
+# deletions), the rest are dropped.
+import json
+import random
+import re
+from pathlib import Path
+from urllib.parse import quote_from_bytes, unquote_to_bytes
+
+# Tokens that move parser state: placeholders, quotes, comments, terminators
+TOKENS = [b"?", b"??", b"#", b"\x00", b"`", b'"', b"'", b"\\", b"--", b"-- ", b"/*", b"*/", b";",
+          b":name", b":", b"$1", b"%", b"%s", b"{", b"}", b"\n", b" ", b"(", b")", b",", b"name"]
+
+ERROR_CLASSES = [
+    ("bind_count", re.compile(r"HY093|Invalid parameter number|wrong number of bind|number of bound variables|"
+                              r"bind message supplies|could not determine data type|not enough arguments", re.I)),
+    ("format", re.compile(r"not all arguments converted|unsupported format character|incomplete format", re.I)),
+    ("named_param", re.compile(r"named parameter|value is required for bind parameter|missing named", re.I)),
+    ("encoding", re.compile(r"invalid byte sequence|incorrect string value|codec can't|null character|"
+                            r"unicode|0x00", re.I)),
+    ("syntax", re.compile(r"syntax error|ER_PARSE_ERROR|error in your SQL syntax|unterminated|unexpected", re.I)),
+    ("unknown_column", re.compile(r"unknown column|no such column|column .* does not exist|ER_BAD_FIELD", re.I)),
+]
+# Echoes that may themselves contain quotes: MySQL's "near '...' at line N"
+# and the query line PostgreSQL appends to its messages
+ECHOES = [(re.compile(r"near '.*' at line", re.S), "near Q at line"), (re.compile(r"\s*LINE \d+:.*", re.S), "")]
+# Quoted payload echoes, up to the last quote on the line since the payload
+# may contain quotes itself; long double-quoted strings are driver messages
+# (PyMySQL's '(1064, "You have an error ...")') and are kept
+QUOTED = re.compile(r"'[^\n]*'|`[^\n]*`|\"[^\"\n]{0,40}\"")
+# Positions and lengths, but not error codes like '(1064,' or 'HY093'
+NUMBER = re.compile(r"(?<!\()\b\d+\b")
+SHAPE_CHARS = 80
+MAX_LEN = 48
+
+
+def error_class(message: str) -> str:
+    for name, rx in ERROR_CLASSES:
+        if rx.search(message):
+            return name
+    return "other"
+
+
+def shape(message: str, payload: str = "") -> str:
+    # What is left of an error message once payload echoes are removed
+    if len(payload) > 2:
+        message = message.replace(payload, "P")
+    for rx, repl in ECHOES:
+        message = rx.sub(repl, message)
+    message = QUOTED.sub("Q", message)
+    message = NUMBER.sub("N", message)
+    return " ".join(message.split())[:SHAPE_CHARS]
+
+
+def signature(http_code: int, body: str, payload: bytes = b"") -> str:
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        data.pop("query", None)
+        error = data.get("error")
+        if error is None:
+            rows = data.get("rows")
+            return f"{http_code}|ok|{len(rows) if isinstance(rows, list) else '-'}"
+        message = error if isinstance(error, str) else json.dumps(error, sort_keys=True)
+    else:
+        message = body or ""
+    return f"{http_code}|{error_class(message)}|{shape(message, payload.decode(errors='replace'))}"
+
+
+def decode(encoded: str) -> bytes:
+    return unquote_to_bytes(encoded)
+
+
+def encode(payload: bytes) -> str:
+    return quote_from_bytes(payload, safe="")
+
+
+class Corpus:
+    # One entry per distinct signature; entries are picked with a bias towards
+    # those that have been mutated least
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.entries = []  # {"payload", "signature", "parent", "mutation", "picked"}
+        self.signatures = {}
+        self.seen = set()
+
+    def add(self, payload: bytes, sig: str, tag: str, parent: str = "", mutation: str = "seed") -> bool:
+        self.seen.add(payload)
+        if sig in self.signatures:
+            return False
+        self.signatures[sig] = len(self.entries)
+        self.entries.append({"payload": payload, "signature": sig, "tag": tag, "parent": parent,
+                             "mutation": mutation, "picked": 0})
+        return True
+
+    def pick(self):
+        # Two random entries, keep the less mutated one
+        a, b = self.rng.choice(self.entries), self.rng.choice(self.entries)
+        entry = a if a["picked"] <= b["picked"] else b
+        entry["picked"] += 1
+        return entry
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as fh:
+            for e in self.entries:
+                fh.write(json.dumps({"tag": e["tag"], "col": encode(e["payload"]), "signature": e["signature"],
+                                     "parent": e["parent"], "mutation": e["mutation"]}) + "\n")
+
+    @staticmethod
+    def load(path: Path):
+        if not path.exists():
+            return []
+        with path.open("r", encoding="utf-8") as fh:
+            return [json.loads(line) for line in fh if line.strip()]
+
+
+def mutate_once(rng: random.Random, data: bytes, other: bytes):
+    op = rng.choice(("insert", "insert", "replace", "flip", "delete", "splice", "duplicate"))
+    i = rng.randint(0, len(data))
+    if op == "insert":
+        tok = rng.choice(TOKENS)
+        return data[:i] + tok + data[i:], f"insert {tok!r}@{i}"
+    if op == "replace" and data:
+        i = min(i, len(data) - 1)
+        tok = rng.choice(TOKENS)
+        return data[:i] + tok + data[i + 1:], f"replace@{i} {tok!r}"
+    if op == "flip" and data:
+        i = min(i, len(data) - 1)
+        b = rng.choice((data[i] ^ (1 << rng.randint(0, 7)), rng.randint(0, 255)))
+        return data[:i] + bytes([b]) + data[i + 1:], f"flip@{i} {b:02X}"
+    if op == "delete" and data:
+        j = rng.randint(i, min(len(data), i + 4))
+        return data[:i] + data[j:], f"delete {i}:{j}"
+    if op == "splice" and other:
+        j = rng.randint(0, len(other))
+        return data[:i] + other[j:], f"splice {i}+{j}"
+    if op == "duplicate" and data:
+        j = rng.randint(i, len(data))
+        return data[:j] + data[i:j] + data[j:], f"duplicate {i}:{j}"
+    tok = rng.choice(TOKENS)
+    return data + tok, f"append {tok!r}"
+
+
+def mutate(rng: random.Random, corpus: Corpus, tries: int = 50):
+    # Returns (parent entry, payload, description) for a payload not sent before
+    for _ in range(tries):
+        entry = corpus.pick()
+        other = rng.choice(corpus.entries)["payload"]
+        data, steps = entry["payload"], []
+        for _ in range(rng.choice((1, 1, 2, 3))):
+            data, step = mutate_once(rng, data, other)
+            steps.append(step)
+        data = data[:MAX_LEN]
+        if data not in corpus.seen:
+            return entry, data, "; ".join(steps)
+    return None
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# Offline payload evaluation for the Python services: no HTTP, no database.
+# Each target runs the query builder of a Python app's endpoint (loaded from
+# its app.py) and then the driver's client-side step (PyMySQL's mogrify-style
+# escaping, SQLAlchemy text() bind compilation per dialect).
+# Requires PyMySQL and SQLAlchemy: pip install PyMySQL SQLAlchemy
+import argparse
+import ast
+import json
+import re
+import sys
+import urllib.parse
+from multiprocessing import Pool
+from pathlib import Path
+
+try:
+    import pymysql.converters
+    from sqlalchemy import String, text
+    from sqlalchemy.dialects import registry
+except ImportError as e:
+    sys.exit(f"offline_eval.py needs PyMySQL and SQLAlchemy ({e}); pip install PyMySQL SQLAlchemy")
+
+from assetnote_fuzzer import payloads_for
+
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def app_builder(service: str, func: str):
+    # The app's own query builder (vuln_sql/vuln_pg_sql), taken from its
+    # app.py without importing it: Flask, FastAPI and the DB drivers need not
+    # be installed. Builders return a string or a text() clause.
+    tree = ast.parse((REPO / service / "app.py").read_text(encoding="utf-8"))
+    node = next(n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name == func)
+    scope = {"text": text}
+    exec(compile(ast.Module(body=[node], type_ignores=[]), f"{service}/app.py", "exec"), scope)
+    build = scope[func]
+
+    def builder(col: str) -> str:
+        sql = build(col)
+        return sql if isinstance(sql, str) else sql.text
+    return builder
+
+
+# (service, endpoint, dialect, builder, driver)
+TARGETS = [
+    ("python-mysql-connector", "/vuln", "mysql", app_builder("python-mysql-connector", "vuln_sql"), "pymysql"),
+    ("python-sqlalchemy", "/vuln", "mysql", app_builder("python-sqlalchemy", "vuln_sql"), "mysql.mysqldb"),
+    ("python-sqlalchemy", "/vuln-pg", "postgres", app_builder("python-sqlalchemy", "vuln_pg_sql"), "postgresql.psycopg"),
+    ("python-sqlalchemy-async", "/vuln", "postgres", app_builder("python-sqlalchemy-async", "vuln_sql"), "postgresql.asyncpg"),
+    ("python-sqlalchemy-oldpg", "/vuln", "mysql", app_builder("python-sqlalchemy-oldpg", "vuln_sql"), "mysql.mysqldb"),
+    ("python-sqlalchemy-oldpg", "/vuln-pg", "postgres", app_builder("python-sqlalchemy-oldpg", "vuln_pg_sql"), "postgresql.psycopg2"),
+]
+# Drivers that interpolate the parameters into the SQL string on the client;
+# psycopg (3) and asyncpg send the statement and the parameters separately
+CLIENT_SIDE = {"pymysql", "mysql.mysqldb", "postgresql.psycopg2"}
+
+PYFORMAT_RX = re.compile(r"%%|%\((\w+)\)s")
+_dialects = {}
+
+
+def get_dialect(name: str):
+    if name not in _dialects:
+        _dialects[name] = registry.load(name)()
+    return _dialects[name]
+
+
+def format_pymysql(sql: str, name: str):
+    # PyMySQL's Cursor.mogrify: query % tuple(escaped args), done client-side.
+    # Formatting only succeeds if exactly one specifier consumed the argument
+    # (a "%%" in col consumes none), so the parameter structure is unchanged.
+    literal = pymysql.converters.escape_item(name, "utf8mb4")
+    final = sql % (literal,)
+    return sql, ["name"], final, False
+
+
+def format_sqlalchemy(sql: str, name: str, driver: str):
+    dialect = get_dialect(driver)
+    compiled = text(sql).compile(dialect=dialect)
+    if compiled.positional:
+        params = list(compiled.positiontup)
+    else:
+        params = [m.group(1) for m in PYFORMAT_RX.finditer(compiled.string) if m.group(1)]
+    missing = sorted(set(params) - {"name"})
+    if missing:
+        raise KeyError(f"A value is required for bind parameter {missing[0]!r}")
+    final = None  # server-side binding: no final SQL string exists
+    if driver in CLIENT_SIDE:
+        # mysqldb/psycopg2 interpolate on the client: emulate that step
+        literal = String().literal_processor(dialect)(name)
+        if compiled.positional:
+            final = compiled.string % tuple(literal for _ in params)
+        else:
+            final = compiled.string % {"name": literal}
+    return compiled.string, params, final, params != ["name"]
+
+
+def evaluate(target, col: str, name: str = "apple"):
+    service, endpoint, dialect, build, driver = target
+    sql = build(col)
+    rec = {
+        "service": service,
+        "endpoint": endpoint,
+        "driver": driver,
+        "col": col,
+        "sql": sql,
+        "compiled": None,
+        "params": None,
+        "binding": "client" if driver in CLIENT_SIDE else "server",
+        "final_sql": None,
+        "structure_changed": True,
+        "error": None,
+    }
+    try:
+        if driver == "pymysql":
+            compiled, params, final, changed = format_pymysql(sql, name)
+        else:
+            compiled, params, final, changed = format_sqlalchemy(sql, name, driver)
+    except Exception as e:
+        rec["error"] = f"{type(e).__name__}: {e}"
+        return rec
+    rec.update(compiled=compiled, params=params, final_sql=final, structure_changed=changed)
+    return rec
+
+
+def iter_payloads(source: str, dialect: str):
+    # Yields (tag, encoded col) pairs, same encoding as the HTTP fuzzers use
+    if source == "assetnote":
+        yield from payloads_for(dialect)
+    elif source == "bytes":
+        for b in range(256):
+            yield f"raw_{b:02X}", f"%{b:02X}"
+            yield f"suffix_{b:02X}", f"name%{b:02X}"
+    else:
+        with open(source, "r", encoding="utf-8") as fh:
+            for i, line in enumerate(fh):
+                line = line.rstrip("\n")
+                if line:
+                    yield f"line_{i + 1}", line
+
+
+def iter_cases(targets, source: str):
+    for idx, target in enumerate(targets):
+        for tag, enc in iter_payloads(source, target[2]):
+            yield idx, tag, enc
+
+
+def _eval_case(case):
+    idx, tag, enc = case
+    # Werkzeug/Starlette decode the query string as UTF-8 with replacement
+    rec = evaluate(TARGETS[idx], urllib.parse.unquote(enc, errors="replace"))
+    rec["tag"] = tag
+    rec["encoded_col"] = enc
+    return rec
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate identifier payloads against the Python apps' query building offline")
+    parser.add_argument("--service", action="append", default=[], help="restrict to this service (repeatable)")
+    parser.add_argument("--payloads", default="assetnote", help="'assetnote', 'bytes' or a file of percent-encoded col values, one per line")
+    parser.add_argument("--out-dir", default="/workspace/out", help="output directory")
+    parser.add_argument("--workers", type=int, default=1, help="evaluate in this many processes")
+    args = parser.parse_args()
+
+    targets = [i for i, t in enumerate(TARGETS) if not args.service or t[0] in args.service]
+    if not targets:
+        sys.exit("No matching services")
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ndjson = out_dir / "offline-eval.ndjson"
+
+    cases = ((i, tag, enc) for i, tag, enc in iter_cases(TARGETS, args.payloads) if i in targets)
+    counts = {}
+    with ndjson.open("w", encoding="utf-8") as nd:
+        if args.workers > 1:
+            pool = Pool(args.workers)
+            results = pool.imap(_eval_case, cases, chunksize=256)
+        else:
+            pool = None
+            results = map(_eval_case, cases)
+        for rec in results:
+            nd.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            key = (rec["service"], rec["endpoint"])
+            total, changed = counts.get(key, (0, 0))
+            counts[key] = (total + 1, changed + rec["structure_changed"])
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    for (service, endpoint), (total, changed) in counts.items():
+        print(f"{service}{endpoint}: structure changed in {changed}/{total}")
+    print(f"Wrote: {ndjson}")
+
+
+if __name__ == "__main__":
+    main()
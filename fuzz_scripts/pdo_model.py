@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# Pure-Python model of PDO's emulated-prepare placeholder scanner
+# (ext/pdo/pdo_sql_parser.re, PHP 8.0-8.3, as shipped in php:8.2 images).
+#
+# The generic scanner knows "..." and '...' strings (backslash escapes), /* */
+# and -- comments, ?? (escaped ?), :name and ? placeholders. It does NOT know
+# MySQL backticks or # comments, and it stops at the first NUL byte outside a
+# comment. That is what makes the Assetnote ?#\0 identifier trick work.
+# PHP 8.4's per-driver scanners are not modelled.
+import argparse
+import json
+import sys
+import urllib.parse
+
+TEXT, BIND, BIND_POS, ESCAPED_QUESTION, EOI = range(1, 6)
+
+SPECIALS = b':?"\'-/'
+BINDCHARS = frozenset(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_")
+# Binding errors in a response: PDO's own HY093, or the server's bind-count
+# error with pgsql ("bind message supplies 2 parameters, but ...")
+PARAM_ERRORS = ("HY093", "Invalid parameter number", "SQLSTATE[08P01]", "bind message supplies")
+
+
+def _string_end(buf: bytes, i: int):
+    # ["]([\\]ANYNOEOF|ANYNOEOF\["\\])*["] and the ' equivalent; None if unterminated
+    quote = buf[i]
+    j = i + 1
+    while True:
+        c = buf[j]
+        if c == 0:
+            return None
+        if c == 0x5C:
+            if buf[j + 1] == 0:
+                return None
+            j += 2
+        elif c == quote:
+            return j + 1
+        else:
+            j += 1
+
+
+def scan(query: bytes):
+    # Yields (token, start, end). The buffer includes PDO's trailing NUL, and
+    # running past it (only possible inside a comment) ends the scan like YYFILL.
+    buf = bytes(query) + b"\0"
+    n = len(buf)
+    i = 0
+    while True:
+        c = buf[i]
+        if c == 0:
+            yield EOI, i, i
+            return
+        nxt = buf[i + 1] if i + 1 < n else None
+        if c in b"\"'":
+            end = _string_end(buf, i)
+            tok, end = (TEXT, end) if end is not None else (TEXT, i + 1)
+        elif c == 0x3A:  # ':'
+            j = i + 1
+            while buf[j] == 0x3A:
+                j += 1
+            if j - i >= 2:
+                tok, end = TEXT, j
+            else:
+                while j < n and buf[j] in BINDCHARS:
+                    j += 1
+                tok, end = (BIND, j) if j > i + 1 else (TEXT, i + 1)
+        elif c == 0x3F:  # '?'
+            tok, end = (ESCAPED_QUESTION, i + 2) if nxt == 0x3F else (BIND_POS, i + 1)
+        elif c == 0x2F and nxt == 0x2A:  # '/*'
+            close = buf.find(b"*/", i + 2)
+            if close < 0:
+                yield EOI, i, n
+                return
+            tok, end = TEXT, close + 2
+        elif c == 0x2D and nxt == 0x2D:  # '--'
+            j = i + 2
+            while j < n and buf[j] not in b"\r\n":
+                j += 1
+            if j >= n:
+                yield EOI, i, n
+                return
+            tok, end = TEXT, j
+        elif c in SPECIALS:
+            tok, end = TEXT, i + 1
+        else:
+            j = i + 1
+            while buf[j] != 0 and buf[j] not in SPECIALS:
+                j += 1
+            tok, end = TEXT, j
+        yield tok, i, end
+        i = end
+
+
+def analyze(query: bytes):
+    # Mirrors the placeholder bookkeeping in pdo_parse_params()
+    positional, named = [], []
+    stopped_at = None
+    for tok, start, end in scan(query):
+        if tok == EOI:
+            stopped_at = start if start < len(query) else None
+            break
+        if tok == BIND:
+            # ":name" glued to a preceding alnum (e.g. "a:b") is not a placeholder
+            if start > 0 and query[start - 1:start].isalnum():
+                continue
+            named.append((start, query[start:end].decode("latin-1")))
+        elif tok == BIND_POS:
+            positional.append(start)
+    return {
+        "positional": positional,
+        "named": named,
+        "mixed": bool(positional and named),
+        "stopped_at": stopped_at,
+    }
+
+
+def vuln_sql(col: bytes, dialect: str = "mysql") -> bytes:
+    # php-pdo-emulate/index.php: vuln_handler() and vuln_pg_handler() build the same SQL
+    quoted = b"`" + col.replace(b"`", b"``") + b"`"
+    return b"SELECT " + quoted + b" FROM fruit WHERE name = ?"
+
+
+def predict(col: bytes, dialect: str = "mysql"):
+    sql = vuln_sql(col, dialect)
+    info = analyze(sql)
+    intended = len(sql) - 1
+    if info["mixed"]:
+        verdict = "mixed"
+    elif info["named"]:
+        verdict = "named"
+    elif not info["positional"]:
+        verdict = "no_placeholder"
+    elif len(info["positional"]) != 1:
+        verdict = "count_mismatch"
+    elif info["positional"][0] != intended:
+        verdict = "shifted"
+    else:
+        verdict = "ok"
+    return {
+        "verdict": verdict,
+        # Binding fails for these: HY093 from PDO itself with MySQL emulation,
+        # a bind-count error from the server with pgsql. With no placeholder at
+        # all pdo_parse_params() returns early and nothing is raised.
+        "param_error": verdict in ("mixed", "named", "count_mismatch"),
+        "interesting": verdict != "ok",
+        "placeholders": len(info["positional"]) + len(info["named"]),
+        "stopped_at": info["stopped_at"],
+    }
+
+
+def predict_encoded(enc: str, dialect: str = "mysql"):
+    return predict(urllib.parse.unquote_to_bytes(enc), dialect)
+
+
+def rank(payloads, dialect: str = "mysql", discard: bool = False):
+    # Orders (tag, encoded col) pairs so predicted parser changes come first;
+    # with discard, payloads predicted "ok" are dropped (benign ones are kept)
+    scored = []
+    for tag, enc in payloads:
+        p = predict_encoded(enc, dialect)
+        if discard and not p["interesting"] and not tag.endswith("benign"):
+            continue
+        scored.append((not p["interesting"], tag, enc, p))
+    scored.sort(key=lambda s: s[0])
+    return [(tag, enc, p) for _, tag, enc, p in scored]
+
+
+def differential(base: str, endpoint: str = "/vuln"):
+    # Compares predicted binding errors against the live php-pdo-emulate service
+    from assetnote_fuzzer import payloads_for
+    from httppool import HTTPPool
+
+    pool = HTTPPool()
+    cases = list(payloads_for("mysql"))
+    for b in range(1, 256):
+        cases.append((f"raw_{b:02X}", f"%{b:02X}"))
+        cases.append((f"qmark_{b:02X}", f"%3F%{b:02X}"))
+        cases.append((f"qmark_{b:02X}_nul", f"%3F%{b:02X}%00"))
+    dialect = "postgres" if endpoint.endswith("-pg") else "mysql"
+    agree = disagree = 0
+    for tag, enc in cases:
+        p = predict_encoded(enc, dialect)
+        try:
+            code, body = pool.get(f"http://{base}{endpoint}?col={enc}&name=apple")
+            text = body.decode(errors="replace")
+        except Exception as e:
+            code, text = 0, str(e)
+        observed = any(err in text for err in PARAM_ERRORS)
+        if observed == p["param_error"]:
+            agree += 1
+        else:
+            disagree += 1
+            print(json.dumps({"tag": tag, "encoded_col": enc, "predicted": p["verdict"],
+                              "http_code": code, "body": text[:200]}, ensure_ascii=False))
+    print(f"Agreement: {agree}/{agree + disagree}")
+    print(pool.summary())
+    return disagree == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model of PDO emulated-prepare placeholder scanning")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_predict = sub.add_parser("predict", help="predict how PDO scans a percent-encoded col payload")
+    p_predict.add_argument("col", nargs="+", help="percent-encoded col value(s)")
+    p_predict.add_argument("--dialect", choices=["mysql", "postgres"], default="mysql")
+    p_check = sub.add_parser("check", help="differential check against the live php-pdo-emulate service")
+    p_check.add_argument("--base", default="php-pdo-emulate:8080", help="host:port of php-pdo-emulate")
+    p_check.add_argument("--endpoint", default="/vuln", help="endpoint path (/vuln or /vuln-pg)")
+    args = parser.parse_args()
+
+    if args.command == "predict":
+        for enc in args.col:
+            print(json.dumps({"encoded_col": enc, **predict_encoded(enc, args.dialect)}))
+        return
+    sys.exit(0 if differential(args.base, args.endpoint) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,95 +1,260 @@
 #!/usr/bin/env python3
 import argparse
+import itertools
 import json
+import multiprocessing
 import sys
 import urllib.parse
-import urllib.request
-import urllib.error
 from pathlib import Path
 
+import batch
+from bodystore import BodyStore
+from checkpoint import Journal, case_id
+from httppool import HTTPPool, format_stats
+from report import PyMySQLSummary, build_reports
+from resultstore import ResultStore
+
+POOL = HTTPPool()
+STORE = None  # optional BodyStore, set by --body-store
+RESULTS = None  # ResultStore, unless --no-db
+BATCH = 0  # cases per POST to <endpoint>/batch, set by --batch; 0 = one GET per case
+
+
+def write_record(journal, rec: dict, service: str = "", endpoint: str = ""):
+    cid = case_id(rec["hex"], rec["variant"])
+    if RESULTS is not None:
+        code = rec["http_code"]
+        RESULTS.add(service, endpoint, f"{rec['variant']}_{rec['hex']}", code,
+                    "error" if code == 0 or code >= 400 else "ok", rec["body"])
+    if STORE is not None:
+        rec = STORE.compact(rec)
+    journal.write(cid, json.dumps(rec, ensure_ascii=False) + "\n")
+
 
 def http_get(url: str):
     try:
-        req = urllib.request.Request(url, method="GET")
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            code = resp.getcode()
-            body = resp.read()
-            return code, body
-    except urllib.error.HTTPError as e:
-        try:
-            body = e.read()
-        except Exception:
-            body = b""
-        return e.code, body
+        return POOL.get(url)
     except Exception as e:
         # Network/timeout error; use 0 status
         return 0, (str(e)).encode()
 
 
-def fuzz(base: str, endpoint: str, out_dir: Path):
+def report(ndjson: Path, target: str = "", extra_lines=(), store=None):
+    json_path = ndjson.with_suffix(".json")
+    md_path = ndjson.with_suffix(".md")
+    build_reports(ndjson, json_path, md_path, PyMySQLSummary(target), extra_lines, store)
+    return json_path, md_path
+
+
+def parse_byte_range(spec: str):
+    lo, _, hi = spec.partition("-")
+    lo, hi = int(lo, 16), int(hi or lo, 16)
+    if not 0 <= lo <= hi <= 0xFF:
+        raise ValueError(f"invalid byte range: {spec}")
+    return lo, hi
+
+
+def parse_shard(spec: str):
+    i, _, n = spec.partition("/")
+    i, n = int(i), int(n)
+    if not 0 <= i < n:
+        raise ValueError(f"invalid shard: {spec}")
+    return i, n
+
+
+def iter_cases(ngram: int = 1, byte_range=(0x00, 0xFF), shard: int = 0, shards: int = 1):
+    # Deterministic enumeration: case k belongs to shard k % shards, so
+    # round-robin merging of the shard files restores the global order
+    lo, hi = byte_range
+    k = 0
+    for seq in itertools.product(range(lo, hi + 1), repeat=ngram):
+        hex_seq = "".join(f"{b:02X}" for b in seq)
+        for variant in ("raw", "suffix"):
+            if k % shards == shard:
+                yield hex_seq, variant
+            k += 1
+
+
+def shard_path(out_dir: Path, shard: int, shards: int) -> Path:
+    if shards == 1:
+        return out_dir / "fuzz-pymysql.ndjson"
+    return out_dir / f"fuzz-pymysql.shard{shard}of{shards}.ndjson"
+
+
+def case_query(hex_seq: str, variant: str) -> str:
+    encoded = "".join(f"%{hex_seq[i:i + 2]}" for i in range(0, len(hex_seq), 2))
+    if variant == "raw":
+        qs = {"col": encoded, "name": "apple"}
+    else:
+        qs = {"col": f"name{encoded}", "name": "apple"}
+    # We want literal %XX in query, so build manually
+    return f"col={qs['col']}&name={urllib.parse.quote(qs['name'])}"
+
+
+def fuzz_cases(base: str, endpoint: str, cases):
+    # (http_code, body) per (hex, variant): one POST to the batch route if
+    # the endpoint has one, else one GET per case
+    if BATCH > 1 and len(cases) > 1:
+        cols = [(b"" if variant == "raw" else b"name") + bytes.fromhex(hex_seq) for hex_seq, variant in cases]
+        results = batch.post(POOL, base, endpoint, [(col, "apple") for col in cols])
+        if results is not None:
+            return [res or get_case(base, endpoint, *case) for case, res in zip(cases, results)]
+    return [get_case(base, endpoint, *case) for case in cases]
+
+
+def get_case(base: str, endpoint: str, hex_seq: str, variant: str):
+    code, body = http_get(f"http://{base}{endpoint}?{case_query(hex_seq, variant)}")
+    return code, body.decode(errors="replace")
+
+
+def fuzz_shard(base: str, endpoint: str, out_dir: Path, ngram: int = 1, byte_range=(0x00, 0xFF), shard: int = 0, shards: int = 1, resume: bool = False):
     out_dir.mkdir(parents=True, exist_ok=True)
-    ndjson_path = out_dir / "fuzz-pymysql.ndjson"
-    json_path = out_dir / "fuzz-pymysql.json"
-    md_path = out_dir / "fuzz-pymysql.md"
-
-    entries = []
-    with ndjson_path.open("w", encoding="utf-8") as nd:
-        for b in range(0, 256):
-            hex_byte = f"{b:02X}"
-            for variant in ("raw", "suffix"):
-                if variant == "raw":
-                    qs = {"col": f"%{hex_byte}", "name": "apple"}
-                else:
-                    qs = {"col": f"name%{hex_byte}", "name": "apple"}
-                # We want literal %XX in query, so build manually
-                query = f"col={qs['col']}&name={urllib.parse.quote(qs['name'])}"
-                url = f"http://{base}{endpoint}?{query}"
-                code, body = http_get(url)
+    ndjson_path = shard_path(out_dir, shard, shards)
+
+    with Journal(ndjson_path, resume) as journal:
+        pending = (case for case in iter_cases(ngram, byte_range, shard, shards) if journal.pending(case_id(*case)))
+        while True:
+            cases = list(itertools.islice(pending, max(1, BATCH)))
+            if not cases:
+                break
+            for (hex_seq, variant), (code, body) in zip(cases, fuzz_cases(base, endpoint, cases)):
                 record = {
-                    "hex": hex_byte,
+                    "hex": hex_seq,
                     "variant": variant,
                     "http_code": code,
-                    "body": body.decode(errors="replace"),
+                    "body": body,
                 }
-                nd.write(json.dumps(record, ensure_ascii=False) + "\n")
-                entries.append(record)
-
-    # Write JSON array
-    with json_path.open("w", encoding="utf-8") as jf:
-        json.dump(entries, jf, ensure_ascii=False, indent=2)
-
-    # Write a simple markdown summary
-    def dist(variant_name: str):
-        counts = {}
-        for r in entries:
-            if r["variant"] != variant_name:
-                continue
-            counts[r["http_code"]] = counts.get(r["http_code"], 0) + 1
-        lines = []
-        for code in sorted(counts.keys()):
-            lines.append(f"- {code}: {counts[code]}")
-        return "\n".join(lines)
-
-    with md_path.open("w", encoding="utf-8") as md:
-        md.write("# PyMySQL fuzz summary\n\n")
-        md.write(f"- Target: http://{base}{endpoint}\n")
-        md.write("- Cases: 512 (256 bytes x 2 variants)\n\n")
-        md.write("## HTTP code distribution (raw)\n")
-        md.write(dist("raw") + "\n\n")
-        md.write("## HTTP code distribution (suffix)\n")
-        md.write(dist("suffix") + "\n")
+                write_record(journal, record, base.split(":", 1)[0], endpoint)
+        if journal.skipped:
+            print(f"Resumed {ndjson_path.name}: skipped {journal.skipped} completed cases")
+    return ndjson_path, POOL.stats()
 
+
+def _fuzz_shard_worker(job):
+    global RESULTS, BATCH
+    base, endpoint, out_dir, ngram, byte_range, shard, shards, resume, pool_size, batch_size, db, run_id = job
+    POOL.pool_size = pool_size
+    BATCH = batch_size
+    if db:
+        # Every shard process writes its cases into the parent's run
+        RESULTS = ResultStore(db)
+        RESULTS.attach(run_id)
+    try:
+        return fuzz_shard(base, endpoint, out_dir, ngram, byte_range, shard, shards, resume)
+    finally:
+        if RESULTS is not None:
+            RESULTS.close()
+
+
+def merge(out_dir: Path, shards: int) -> Path:
+    # Interleave shard files line by line; shard i holds cases i, i+N, i+2N, ...
+    merged = out_dir / "fuzz-pymysql.ndjson"
+    handles = [shard_path(out_dir, i, shards).open("r", encoding="utf-8") for i in range(shards)]
+    try:
+        with merged.open("w", encoding="utf-8") as out:
+            live = handles
+            while live:
+                still = []
+                for fh in live:
+                    line = fh.readline()
+                    if line:
+                        out.write(line)
+                        still.append(fh)
+                live = still
+    finally:
+        for fh in handles:
+            fh.close()
+    return merged
+
+
+def fuzz(base: str, endpoint: str, out_dir: Path, ngram: int = 1, byte_range=(0x00, 0xFF), workers: int = 1, resume: bool = False):
+    global RESULTS
+    if workers > 1:
+        db, run_id = (RESULTS.path, RESULTS.run_id) if RESULTS is not None else (None, None)
+        if RESULTS is not None:
+            RESULTS.close()  # SQLite connections must not cross fork()
+        jobs = [(base, endpoint, out_dir, ngram, byte_range, i, workers, resume, POOL.pool_size, BATCH, db, run_id)
+                for i in range(workers)]
+        with multiprocessing.Pool(workers) as procs:
+            shard_stats = [stats for _, stats in procs.map(_fuzz_shard_worker, jobs)]
+        ndjson_path = merge(out_dir, workers)
+        if db:
+            RESULTS = ResultStore(db)
+            RESULTS.attach(run_id)
+        pool_summary = format_stats({k: sum(s[k] for s in shard_stats) for k in shard_stats[0]})
+    else:
+        ndjson_path, _ = fuzz_shard(base, endpoint, out_dir, ngram, byte_range, resume=resume)
+        pool_summary = POOL.summary()
+
+    summary = [pool_summary] + ([STORE.summary()] if STORE is not None else [])
+    if RESULTS is not None:
+        RESULTS.finish_run()
+        summary.append(RESULTS.summary())
+    json_path, md_path = report(ndjson_path, f"http://{base}{endpoint}", [""] + summary)
     print(f"Wrote: {ndjson_path}, {json_path}, {md_path}")
+    print("\n".join(summary))
 
 
 def main():
     parser = argparse.ArgumentParser(description="Fuzz PyMySQL vuln endpoint with bytes 0x00..0xFF")
+    parser.add_argument("command", nargs="?", choices=["run", "report", "merge"], default="run", help="run the fuzzer (default), rebuild .json/.md from an existing NDJSON, or merge --shards shard files")
+    parser.add_argument("--ndjson", help="NDJSON file for the report command (default: OUT_DIR/fuzz-pymysql.ndjson)")
     parser.add_argument("--base", default="python-mysql-connector:5000", help="host:port inside Docker network")
     parser.add_argument("--endpoint", default="/vuln", help="endpoint path")
     parser.add_argument("--out-dir", default="/workspace/out", help="output directory path")
+    parser.add_argument("--body-store", help="store deduplicated, compressed bodies in this directory and keep only hash/length/prefix in the NDJSON; with report, resolve bodies back into the .json")
+    parser.add_argument("--pool-size", type=int, default=8, help="idle keep-alive connections kept to the target")
+    parser.add_argument("--ngram", type=int, default=1, help="length of the byte sequences to sweep (1 = single bytes)")
+    parser.add_argument("--byte-range", default="00-FF", help="hex byte range used for every position, e.g. 00-7F")
+    parser.add_argument("--workers", type=int, default=1, help="split the sweep into this many shards run by a local process pool, then merge")
+    parser.add_argument("--shard", help="run only shard I/N (e.g. 0/4) and write its own NDJSON; combine later with merge")
+    parser.add_argument("--shards", type=int, help="number of shard files for the merge command")
+    parser.add_argument("--resume", action="store_true", help="append to an existing run (or shard) and skip cases recorded in its checkpoint journal")
+    parser.add_argument("--batch", type=int, default=0, help="send up to N cases per POST to <endpoint>/batch (falls back to one GET per case if the target has no batch route)")
+    parser.add_argument("--db", help="SQLite results store shared with assetnote_fuzzer.py and run_tests.py (default: OUT_DIR/results.sqlite)")
+    parser.add_argument("--no-db", action="store_true", help="do not record the run in the results store")
+    parser.add_argument("--label", default="", help="name of the run in the results store, e.g. the PyMySQL version under test")
     args = parser.parse_args()
+    try:
+        byte_range = parse_byte_range(args.byte_range)
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.body_store and (args.workers > 1 or shard) and args.command == "run":
+        parser.error("--body-store cannot be shared between shards")
+    global STORE, RESULTS, BATCH
+    BATCH = args.batch
+    if args.body_store:
+        STORE = BodyStore(Path(args.body_store))
+    if args.command == "report":
+        ndjson = Path(args.ndjson) if args.ndjson else Path(args.out_dir) / "fuzz-pymysql.ndjson"
+        json_path, md_path = report(ndjson, f"http://{args.base}{args.endpoint}", store=STORE)
+        print(f"Wrote: {json_path}, {md_path}")
+        return
+    if args.command == "merge":
+        if not args.shards:
+            parser.error("merge needs --shards N")
+        ndjson = merge(Path(args.out_dir), args.shards)
+        json_path, md_path = report(ndjson, f"http://{args.base}{args.endpoint}", store=STORE)
+        print(f"Wrote: {ndjson}, {json_path}, {md_path}")
+        return
+    POOL.pool_size = args.pool_size
+    if not args.no_db:
+        RESULTS = ResultStore(Path(args.db) if args.db else Path(args.out_dir) / "results.sqlite")
+        meta = {"base": args.base, "endpoint": args.endpoint, "ngram": args.ngram, "byte_range": args.byte_range,
+                "batch": args.batch}
+        RESULTS.start_run("pymysql", args.label, meta, args.resume, shard,
+                          key=("base", "endpoint", "ngram", "byte_range"))
 
-    fuzz(args.base, args.endpoint, Path(args.out_dir))
+    if shard:
+        ndjson, _ = fuzz_shard(args.base, args.endpoint, Path(args.out_dir), args.ngram, byte_range, *shard, args.resume)
+        print(f"Wrote: {ndjson}")
+        print(POOL.summary())
+        if RESULTS is not None:
+            RESULTS.finish_run()
+            print(RESULTS.summary())
+        return
+    fuzz(args.base, args.endpoint, Path(args.out_dir), args.ngram, byte_range, args.workers, args.resume)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Single-pass report builder for the fuzzers' NDJSON output.
+# The NDJSON file is the only thing written while fuzzing; the .json array and
+# the .md summary are derived from it here without holding records in memory.
+import bisect
+import json
+from pathlib import Path
+
+
+def iter_ndjson(path: Path):
+    with path.open("r", encoding="utf-8") as nd:
+        for line in nd:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class JsonArrayWriter:
+    # Streams records into a file laid out exactly like json.dump(records, indent=2)
+    def __init__(self, fh):
+        self.fh = fh
+        self.count = 0
+
+    def write(self, rec: dict):
+        self.fh.write("[\n" if self.count == 0 else ",\n")
+        # Indent on "\n" only: strings may hold U+2028 or U+0085, which
+        # splitlines()-based helpers such as textwrap.indent break on
+        self.fh.write("  " + json.dumps(rec, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+        self.count += 1
+
+    def close(self):
+        self.fh.write("\n]" if self.count else "[]")
+
+
+class AssetnoteSummary:
+    TOP_TAGS = 10
+
+    def __init__(self):
+        self.services = {}
+
+    def add(self, rec: dict):
+        svc = self.services.setdefault(rec["service"], {"total": 0, "hits": 0, "tags": []})
+        svc["total"] += 1
+        if rec["indicator"]:
+            svc["hits"] += 1
+            # Keep only the first TOP_TAGS distinct tags in sorted order
+            tags = svc["tags"]
+            i = bisect.bisect_left(tags, rec["tag"])
+            if i < self.TOP_TAGS and (i == len(tags) or tags[i] != rec["tag"]):
+                tags.insert(i, rec["tag"])
+                del tags[self.TOP_TAGS:]
+
+    def write_md(self, md):
+        md.write("# Assetnote-style parser fuzz results\n\n")
+        for name in sorted(self.services):
+            svc = self.services[name]
+            md.write(f"## {name} — indicators: {svc['hits']}/{svc['total']}\n")
+            for t in svc["tags"]:
+                md.write(f"- {t}\n")
+            md.write("\n")
+
+
+class PyMySQLSummary:
+    def __init__(self, target: str = ""):
+        self.target = target
+        self.variants = {}
+        self.ngram = 1
+
+    def add(self, rec: dict):
+        self.ngram = max(self.ngram, len(rec["hex"]) // 2)
+        counts = self.variants.setdefault(rec["variant"], {})
+        counts[rec["http_code"]] = counts.get(rec["http_code"], 0) + 1
+
+    def write_md(self, md):
+        total = sum(sum(c.values()) for c in self.variants.values())
+        n_variants = len(self.variants)
+        md.write("# PyMySQL fuzz summary\n\n")
+        if self.target:
+            md.write(f"- Target: {self.target}\n")
+        if n_variants:
+            unit = "bytes" if self.ngram == 1 else f"{self.ngram}-byte sequences"
+            md.write(f"- Cases: {total} ({total // n_variants} {unit} x {n_variants} variants)\n\n")
+        else:
+            md.write("- Cases: 0\n\n")
+        sections = []
+        for variant, counts in self.variants.items():
+            lines = [f"## HTTP code distribution ({variant})"]
+            lines += [f"- {code}: {counts[code]}" for code in sorted(counts)]
+            sections.append("\n".join(lines))
+        md.write("\n\n".join(sections) + "\n")
+
+
+def build_reports(ndjson: Path, json_path: Path, md_path: Path, summary, extra_lines=(), store=None):
+    # With a BodyStore, hashed bodies are resolved back into the .json array
+    with json_path.open("w", encoding="utf-8") as jf:
+        writer = JsonArrayWriter(jf)
+        for rec in iter_ndjson(ndjson):
+            if store is not None:
+                rec = store.expand(rec)
+            writer.write(rec)
+            summary.add(rec)
+        writer.close()
+    with md_path.open("w", encoding="utf-8") as md:
+        summary.write_md(md)
+        for line in extra_lines:
+            md.write(f"{line}\n")
+    return writer.count
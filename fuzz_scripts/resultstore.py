@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# SQLite store shared by assetnote_fuzzer.py, pymysql_fuzzer.py and
+# tests/run_tests.py. Every run gets a row in `runs`; every case a row in
+# `cases` keyed by (run, service, endpoint, tag) with its verdict and a
+# response signature (hash of status and body). Rows are buffered and
+# inserted in one transaction per batch. `diff` compares two runs with
+# indexed joins, so it does not load any report files.
+#
+#   python resultstore.py runs --db out/results.sqlite
+#   python resultstore.py diff --db out/results.sqlite --tool pymysql      # last two pymysql runs
+#   python resultstore.py diff --db out/results.sqlite 3 7 --signature
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,
+    label TEXT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    cases INTEGER NOT NULL DEFAULT 0,
+    meta TEXT
+);
+CREATE TABLE IF NOT EXISTS cases (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    service TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    http_code INTEGER,
+    verdict TEXT,
+    signature TEXT,
+    body_len INTEGER,
+    detail TEXT,
+    PRIMARY KEY (run_id, service, endpoint, tag)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cases_key ON cases(service, endpoint, tag, run_id);
+CREATE INDEX IF NOT EXISTS cases_signature ON cases(signature);
+CREATE INDEX IF NOT EXISTS runs_tool ON runs(tool, id);
+"""
+
+DETAIL_CHARS = 120
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def signature(http_code: int, body: str) -> str:
+    return hashlib.blake2b(f"{http_code}\x1f{body}".encode("utf-8", "replace"), digest_size=8).hexdigest()
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Shard processes of pymysql_fuzzer.py write to the same file
+    db = sqlite3.connect(str(path), timeout=60, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+class ResultStore:
+    def __init__(self, path: Path, batch_size: int = 500):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.db = connect(self.path)
+        self.run_id = None
+        self.shard = None
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def start_run(self, tool: str, label: str = "", meta=None, resume: bool = False, shard=None, key=None) -> int:
+        # A run is identified by tool, label and the meta values listed in key
+        # (all of meta by default). With resume, cases are added to the latest
+        # such run (re-sent cases replace their earlier rows). Shards of one
+        # sweep (shard = (i, n)) share a run: shard i joins the latest such run
+        # that has not finished shard i yet.
+        meta = dict(meta or {})
+        if shard is not None:
+            meta["shards"] = shard[1]
+            key = None if key is None else (*key, "shards")
+        ident = {k: meta.get(k) for k in (meta if key is None else key)}
+        self.shard = shard
+        with self._lock:
+            # one shard at a time, so concurrent shards do not each insert a run
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.run_id = None
+                for run_id, run_meta in self.db.execute(
+                        "SELECT id, meta FROM runs WHERE tool = ? AND label IS ? ORDER BY id DESC",
+                        (tool, label or None)):
+                    run_meta = json.loads(run_meta or "{}")
+                    if {k: run_meta.get(k) for k in ident} != ident or ("shards" in run_meta) != (shard is not None):
+                        continue
+                    if resume or (shard is not None and shard[0] not in run_meta.get("finished_shards", [])):
+                        self.run_id = run_id
+                    break
+                if self.run_id is None:
+                    cur = self.db.execute("INSERT INTO runs (tool, label, started_at, meta) VALUES (?, ?, ?, ?)",
+                                          (tool, label or None, now(), json.dumps(meta)))
+                    self.run_id = cur.lastrowid
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                raise
+        return self.run_id
+
+    def attach(self, run_id: int):
+        self.run_id = run_id
+
+    def add(self, service: str, endpoint: str, tag: str, http_code: int, verdict: str, body: str):
+        row = (self.run_id, service, endpoint, tag, http_code, verdict, signature(http_code, body),
+               len(body), body[:DETAIL_CHARS])
+        with self._lock:
+            self._rows.append(row)
+            if len(self._rows) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        if self._rows:
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO cases VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._rows)
+            self._rows = []
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def finish_run(self):
+        self.flush()
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                finished = now()
+                if self.shard is not None:
+                    # A shard run is finished once all of its shards are
+                    meta = json.loads(self.db.execute("SELECT meta FROM runs WHERE id = ?",
+                                                      (self.run_id,)).fetchone()[0] or "{}")
+                    done = sorted(set(meta.get("finished_shards", [])) | {self.shard[0]})
+                    meta["finished_shards"] = done
+                    self.db.execute("UPDATE runs SET meta = ? WHERE id = ?", (json.dumps(meta), self.run_id))
+                    if len(done) < self.shard[1]:
+                        finished = None
+                self.db.execute("UPDATE runs SET finished_at = ?, cases = (SELECT COUNT(*) FROM cases WHERE run_id = ?) "
+                                "WHERE id = ?", (finished, self.run_id, self.run_id))
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                raise
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def summary(self) -> str:
+        self.flush()
+        cases = self.db.execute("SELECT COUNT(*) FROM cases WHERE run_id = ?", (self.run_id,)).fetchone()[0]
+        return f"Results store: run {self.run_id} in {self.path} ({cases} cases)"
+
+
+def resolve_run(db: sqlite3.Connection, ref: str) -> int:
+    # A run id, or the latest run with this label
+    if ref.isdigit():
+        row = db.execute("SELECT id FROM runs WHERE id = ?", (int(ref),)).fetchone()
+    else:
+        row = db.execute("SELECT id FROM runs WHERE label = ? ORDER BY id DESC LIMIT 1", (ref,)).fetchone()
+    if not row:
+        raise ValueError(f"no such run: {ref}")
+    return row[0]
+
+
+def diff(db: sqlite3.Connection, old: int, new: int, signatures: bool = False):
+    # Yields (service, endpoint, tag, old verdict, new verdict, new detail);
+    # None on one side means the case is missing from that run
+    changed = "a.verdict IS NOT b.verdict" + (" OR a.signature IS NOT b.signature" if signatures else "")
+    yield from db.execute(f"""
+        SELECT a.service, a.endpoint, a.tag, a.verdict, b.verdict, b.detail
+        FROM cases a JOIN cases b
+          ON b.run_id = ? AND b.service = a.service AND b.endpoint = a.endpoint AND b.tag = a.tag
+        WHERE a.run_id = ? AND ({changed})
+        ORDER BY a.service, a.endpoint, a.tag""", (new, old))
+    yield from db.execute("""
+        SELECT a.service, a.endpoint, a.tag, a.verdict, NULL, NULL FROM cases a
+        WHERE a.run_id = ? AND NOT EXISTS (SELECT 1 FROM cases b WHERE b.run_id = ? AND b.service = a.service
+                                           AND b.endpoint = a.endpoint AND b.tag = a.tag)
+        ORDER BY a.service, a.endpoint, a.tag""", (old, new))
+    yield from db.execute("""
+        SELECT b.service, b.endpoint, b.tag, NULL, b.verdict, b.detail FROM cases b
+        WHERE b.run_id = ? AND NOT EXISTS (SELECT 1 FROM cases a WHERE a.run_id = ? AND a.service = b.service
+                                           AND a.endpoint = b.endpoint AND a.tag = b.tag)
+        ORDER BY b.service, b.endpoint, b.tag""", (new, old))
+
+
+def print_runs(db: sqlite3.Connection, tool: str = ""):
+    rows = db.execute("SELECT id, tool, label, started_at, finished_at, cases FROM runs "
+                      + ("WHERE tool = ? " if tool else "") + "ORDER BY id", (tool,) if tool else ())
+    for run_id, run_tool, label, started, finished, cases in rows:
+        state = f"{cases} cases" if finished else "unfinished"
+        print(f"{run_id:>4}  {run_tool:<10} {label or '-':<20} {started}  {state}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List runs in the results store or diff two of them")
+    parser.add_argument("command", choices=["runs", "diff"])
+    parser.add_argument("old", nargs="?", help="run id or label (default: second latest run of --tool)")
+    parser.add_argument("new", nargs="?", help="run id or label (default: latest run of --tool)")
+    parser.add_argument("--db", default="/workspace/out/results.sqlite", help="results store")
+    parser.add_argument("--tool", default="", help="assetnote, pymysql or run_tests")
+    parser.add_argument("--signature", action="store_true", help="also list cases whose verdict is unchanged but whose response differs")
+    parser.add_argument("--limit", type=int, default=200, help="print at most this many changed cases")
+    args = parser.parse_intermixed_args()
+    if not Path(args.db).exists():
+        parser.error(f"no results store at {args.db}")
+    db = connect(Path(args.db))
+    if args.command == "runs":
+        print_runs(db, args.tool)
+        return
+
+    try:
+        if args.old and args.new:
+            old, new = resolve_run(db, args.old), resolve_run(db, args.new)
+        else:
+            if not args.tool:
+                parser.error("diff needs two runs or --tool")
+            # Finished runs only (a shard run once all its shards are); older
+            # per-shard runs ("shard" in meta) hold part of a sweep each
+            ids = [r[0] for r in db.execute(
+                "SELECT id FROM runs WHERE tool = ? AND finished_at IS NOT NULL "
+                "AND json_extract(meta, '$.shard') IS NULL ORDER BY id DESC LIMIT 2", (args.tool,))]
+            if len(ids) < 2:
+                parser.error(f"fewer than two finished {args.tool} runs in {args.db}")
+            new, old = ids
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    rows = list(diff(db, old, new, args.signature))
+    elapsed = (time.perf_counter() - start) * 1000
+    for service, endpoint, tag, a, b, detail in rows[: args.limit]:
+        line = f"{service} {endpoint} {tag}: {a or '(missing)'} -> {b or '(missing)'}"
+        print(line + (f"  {detail!r}" if detail else ""))
+    if len(rows) > args.limit:
+        print(f"... {len(rows) - args.limit} more")
+    print(f"Run {old} -> {new}: {len(rows)} changed cases ({elapsed:.1f} ms)", file=sys.stderr)
+    sys.exit(1 if rows else 0)
+
+
+if __name__ == "__main__":
+    main()
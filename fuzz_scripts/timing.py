@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Timing oracle for blind (SLEEP()/pg_sleep()) payloads.
+# Baseline and probe requests are interleaved (B P B P ...) so slow drift in the
+# target hits both series equally. Sampling stops as soon as a one-sided
+# Mann-Whitney U test says the probe is slower, or once enough samples were
+# taken for the service's baseline jitter to rule a delay out.
+import math
+import statistics
+
+
+def mad(xs):
+    med = statistics.median(xs)
+    return statistics.median(abs(x - med) for x in xs)
+
+
+def mann_whitney_greater(xs, ys):
+    # One-sided p-value for "ys tends to be larger than xs" (normal
+    # approximation with tie correction)
+    n1, n2 = len(xs), len(ys)
+    ranked = sorted([(v, 0) for v in xs] + [(v, 1) for v in ys])
+    ranks = [0.0] * len(ranked)
+    ties = 0.0
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        avg = (i + j) / 2 + 1
+        for k in range(i, j + 1):
+            ranks[k] = avg
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+    r2 = sum(r for r, (_, group) in zip(ranks, ranked) if group == 1)
+    u2 = r2 - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    mean = n1 * n2 / 2
+    var = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if var <= 0:
+        return 1.0
+    z = (u2 - mean - 0.5) / math.sqrt(var)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def required_samples(baseline, effect: float, min_samples: int, max_samples: int) -> int:
+    # Noisier services need more samples to resolve an effect of `effect`
+    # seconds: n grows with (robust sigma / effect)^2
+    sigma = 1.4826 * mad(baseline) if len(baseline) > 1 else 0.0
+    if effect <= 0:
+        return max_samples
+    n = math.ceil(8 * (sigma / effect) ** 2)
+    return max(min_samples, min(max_samples, n))
+
+
+def probe(fetch, baseline_url: str, probe_url: str, sleep: float, alpha: float = 0.01,
+          min_samples: int = 5, max_samples: int = 30):
+    # fetch(url) -> (http_code, seconds). Returns a result dict with the samples
+    # and a verdict: delayed | no_delay | inconclusive
+    base, test, codes = [], [], set()
+    effect = sleep / 2
+    p = 1.0
+    while len(test) < max_samples:
+        code, t = fetch(baseline_url)
+        base.append(t)
+        code, t = fetch(probe_url)
+        test.append(t)
+        codes.add(code)
+        if len(test) < min_samples:
+            continue
+        p = mann_whitney_greater(base, test)
+        delta = statistics.median(test) - statistics.median(base)
+        if p < alpha and delta >= effect:
+            verdict = "delayed"
+            break
+        if len(test) >= required_samples(base, effect, min_samples, max_samples) and delta < effect:
+            verdict = "no_delay"
+            break
+    else:
+        verdict = "inconclusive"
+    return {
+        "samples": len(test),
+        "baseline_ms": round(statistics.median(base) * 1000, 2),
+        "baseline_mad_ms": round(mad(base) * 1000, 2),
+        "probe_ms": round(statistics.median(test) * 1000, 2),
+        "delta_ms": round((statistics.median(test) - statistics.median(base)) * 1000, 2),
+        "p_value": p,
+        "probe_http_codes": sorted(codes),
+        "verdict": verdict,
+    }
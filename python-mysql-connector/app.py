@@ -1,4 +1,7 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
+from contextlib import contextmanager
+import threading
+import time
 import pymysql
 
 app = Flask(__name__)
@@ -16,15 +19,146 @@ def get_conn():
 
 import os
 
+class Pool:
+    # Bounded pool of get_conn() connections shared by the request threads.
+    # Idle connections are pinged before reuse once they have sat for
+    # ping_after seconds; a connection whose query failed is pinged before it
+    # goes back, and replaced if the failure broke it.
+    def __init__(self, size, timeout, ping_after, max_age):
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.max_age = max_age
+        self.idle = []  # (conn, created, last_used)
+        self.cond = threading.Condition()
+        self.open = 0
+        self.stats = {'created': 0, 'recycled': 0, 'waits': 0, 'wait_ms': 0.0, 'timeouts': 0}
+
+    def close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self.cond:
+            self.stats['recycled'] += 1
+
+    def discard(self, conn):
+        self.close(conn)
+        with self.cond:
+            self.open -= 1
+            self.cond.notify()
+
+    def alive(self, conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def checkout(self):
+        start = time.monotonic()
+        with self.cond:
+            waited = False
+            while not self.idle and self.open >= self.size:
+                waited = True
+                left = self.timeout - (time.monotonic() - start)
+                if left <= 0:
+                    self.stats['timeouts'] += 1
+                    raise pymysql.err.OperationalError(2013, 'connection pool exhausted')
+                self.cond.wait(left)
+            if waited:
+                self.stats['waits'] += 1
+                self.stats['wait_ms'] += (time.monotonic() - start) * 1000
+            if self.idle:
+                conn, created, last_used = self.idle.pop()
+            else:
+                conn, created, last_used = None, 0.0, 0.0
+                self.open += 1
+        now = time.monotonic()
+        if conn is not None:
+            if now - created <= self.max_age and (now - last_used <= self.ping_after or self.alive(conn)):
+                return conn, created
+            # stale or dead: replace it, keeping its slot
+            self.close(conn)
+        try:
+            conn = get_conn()
+        except Exception:
+            with self.cond:
+                self.open -= 1
+                self.cond.notify()
+            raise
+        with self.cond:
+            self.stats['created'] += 1
+        return conn, now
+
+    def checkin(self, conn, created, failed):
+        if failed and not self.alive(conn):
+            return self.discard(conn)
+        with self.cond:
+            self.idle.append((conn, created, time.monotonic()))
+            self.cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn, created = self.checkout()
+        # db_ms starts once the connection is held; the wait for a free slot
+        # is counted in wait_ms
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield conn
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.checkin(conn, created, failed)
+            g.db_ms = g.get('db_ms', 0.0) + (time.perf_counter() - start) * 1000
+
+    def metrics(self):
+        with self.cond:
+            return dict(self.stats, size=self.size, open=self.open, idle=len(self.idle),
+                        in_use=self.open - len(self.idle), wait_ms=round(self.stats['wait_ms'], 1))
+
+pool = Pool(
+    size = int(os.getenv('DB_POOL_SIZE', '16')),
+    timeout = float(os.getenv('DB_POOL_TIMEOUT', '10')),
+    ping_after = float(os.getenv('DB_POOL_PING_AFTER', '30')),
+    max_age = float(os.getenv('DB_POOL_MAX_AGE', '3600')),
+)
+
+# most cases accepted by one /vuln/batch request
+BATCH_MAX = int(os.getenv('BATCH_MAX', '1000'))
+
+# per endpoint: requests, total and max time spent holding a DB connection
+timings = {}
+timings_lock = threading.Lock()
+
+@app.after_request
+def record_timing(resp):
+    if 'db_ms' in g:
+        resp.headers['Server-Timing'] = f"db;dur={g.db_ms:.2f}"
+        with timings_lock:
+            t = timings.setdefault(request.path, {'requests': 0, 'db_ms': 0.0, 'max_ms': 0.0})
+            t['requests'] += 1
+            t['db_ms'] += g.db_ms
+            t['max_ms'] = max(t['max_ms'], g.db_ms)
+    return resp
+
+@app.get('/metrics')
+def metrics():
+    with timings_lock:
+        db = {path: dict(t, db_ms=round(t['db_ms'], 1), max_ms=round(t['max_ms'], 2),
+                         avg_ms=round(t['db_ms'] / t['requests'], 2))
+              for path, t in timings.items()}
+    return jsonify(pool=pool.metrics(), db=db)
+
 @app.get('/health')
 def health():
     try:
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute('SELECT 1')
-        cur.fetchall()
-        cur.close()
-        conn.close()
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+                cur.fetchall()
         return jsonify(ok=True)
     except Exception as e:
         return jsonify(ok=False, error=str(e)), 500
@@ -38,33 +172,67 @@ def safe():
         return jsonify(error='invalid column'), 400
     sql = f"SELECT `{col}` AS val FROM fruit WHERE name = %s"
     try:
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute(sql, (name,))
-        rows = cur.fetchall()
-        cur.close(); conn.close()
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (name,))
+                rows = cur.fetchall()
         return jsonify(rows=rows)
     except Exception as e:
         return jsonify(error=str(e)), 500
 
+def vuln_sql(col):
+    # VULN: naive backtick escaping; leaves '?' and comments that may affect parsers or cause injection when concatenated elsewhere
+    sanitized = col.replace('`', '``')
+    return f"SELECT `{sanitized}` AS val FROM fruit WHERE name = %s"
+
 @app.get('/vuln')
 def vuln():
     name = request.args.get('name', '')
     col = str(request.args.get('col', 'name'))
-    # VULN: naive backtick escaping; leaves '?' and comments that may affect parsers or cause injection when concatenated elsewhere
-    sanitized = col.replace('`', '``')
-    sql = f"SELECT `{sanitized}` AS val FROM fruit WHERE name = %s"
+    sql = vuln_sql(col)
     try:
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute(sql, (name,))
-        rows = cur.fetchall()
-        cur.close(); conn.close()
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (name,))
+                rows = cur.fetchall()
         return jsonify(query=sql, rows=rows)
     except Exception as e:
         return jsonify(query=sql, error=str(e)), 500
 
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
+def batch_cases():
+    # JSON array of {"col", "name"} objects, or None if the body is not one
+    cases = request.get_json(silent=True)
+    if not isinstance(cases, list) or len(cases) > BATCH_MAX or not all(isinstance(c, dict) for c in cases):
+        return None
+    return cases
 
+@app.post('/vuln/batch')
+def vuln_batch():
+    # The cases of /vuln over one pooled connection. A failed case is caught
+    # and the connection re-established if the error broke it, so it cannot
+    # affect the cases after it.
+    cases = batch_cases()
+    if cases is None:
+        return jsonify(error=f'expected a JSON array of at most {BATCH_MAX} {{"col", "name"}} objects'), 400
+    results = []
+    start = time.perf_counter()
+    try:
+        with pool.connection() as conn:
+            for case in cases:
+                sql = vuln_sql(str(case.get('col', 'name')))
+                case_start = time.perf_counter()
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(sql, (str(case.get('name', '')),))
+                        res = {'status': 200, 'query': sql, 'rows': cur.fetchall()}
+                except Exception as e:
+                    res = {'status': 500, 'query': sql, 'error': str(e)}
+                    conn.ping(reconnect=True)
+                res['ms'] = round((time.perf_counter() - case_start) * 1000, 3)
+                results.append(res)
+    except Exception as e:
+        return jsonify(error=str(e), results=results), 500
+    return jsonify(results=results, ms=round((time.perf_counter() - start) * 1000, 3))
 
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000, threaded=True)
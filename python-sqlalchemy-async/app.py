@@ -1,5 +1,6 @@
 import os
-from fastapi import FastAPI, HTTPException
+import time
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse
 import uvicorn
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncConnection
@@ -12,6 +13,9 @@ PG_USER = os.getenv("PG_USER", "app")
 PG_PASS = os.getenv("PG_PASS", "apppass")
 PG_DB = os.getenv("PG_DB", "demopg")
 
+# most cases accepted by one /vuln/batch request
+BATCH_MAX = int(os.getenv("BATCH_MAX", "1000"))
+
 # SQLAlchemy async engine using asyncpg
 engine = create_async_engine(
     f"postgresql+asyncpg://{PG_USER}:{PG_PASS}@{PG_HOST}:5432/{PG_DB}",
@@ -41,11 +45,14 @@ async def safe(name: str = "", col: str = "name"):
     except Exception as e:
         return JSONResponse({"query": str(sql), "error": str(e)}, status_code=500)
 
-@APP.get("/vuln")
-async def vuln(name: str = "", col: str = "name"):
+def vuln_sql(col: str):
     # VULN: naive identifier interpolation with double quotes
     sanitized = col.replace('"', '""')
-    sql = text(f'SELECT "{sanitized}" AS val FROM users WHERE name = :name')
+    return text(f'SELECT "{sanitized}" AS val FROM users WHERE name = :name')
+
+@APP.get("/vuln")
+async def vuln(name: str = "", col: str = "name"):
+    sql = vuln_sql(col)
     try:
         async with engine.connect() as conn:
             result = await conn.execute(sql, {"name": name})
@@ -54,6 +61,36 @@ async def vuln(name: str = "", col: str = "name"):
     except Exception as e:
         return JSONResponse({"query": str(sql), "error": str(e)}, status_code=500)
 
+@APP.post("/vuln/batch")
+async def vuln_batch(request: Request):
+    # The cases of /vuln over one pooled connection. A failed case rolls back
+    # its (aborted) transaction so the next case starts clean; a broken
+    # connection is replaced on the next execute.
+    try:
+        cases = await request.json()
+    except ValueError:
+        cases = None
+    if not isinstance(cases, list) or len(cases) > BATCH_MAX or not all(isinstance(c, dict) for c in cases):
+        return JSONResponse({"error": f'expected a JSON array of at most {BATCH_MAX} {{"col", "name"}} objects'}, status_code=400)
+    results = []
+    start = time.perf_counter()
+    try:
+        async with engine.connect() as conn:
+            for case in cases:
+                sql = vuln_sql(str(case.get("col", "name")))
+                case_start = time.perf_counter()
+                try:
+                    result = await conn.execute(sql, {"name": str(case.get("name", ""))})
+                    res = {"status": 200, "query": str(sql), "rows": [dict(r._mapping) for r in result]}
+                except Exception as e:
+                    res = {"status": 500, "query": str(sql), "error": str(e)}
+                    await conn.rollback()
+                res["ms"] = round((time.perf_counter() - case_start) * 1000, 3)
+                results.append(res)
+    except Exception as e:
+        return JSONResponse({"error": str(e), "results": results}, status_code=500)
+    return {"results": results, "ms": round((time.perf_counter() - start) * 1000, 3)}
+
 if __name__ == "__main__":
     uvicorn.run(APP, host="0.0.0.0", port=5000)
 
@@ -41,13 +41,20 @@ def safe():
     except Exception as e:
         return jsonify(error=str(e)), 500
 
+def vuln_sql(col):
+    col = '`' + col.replace('`', '``') + '`'
+    return text(f"SELECT {col} AS val FROM fruit WHERE name = :name")
+
+def vuln_pg_sql(col):
+#    col = '`' + col.replace('`', '``') + '`'
+    col = '"' + col.replace('"', '\\"') + '"'
+    return text(f"SELECT {col} FROM users WHERE name = :name")
+
 @app.get('/vuln')
 def vuln():
     name = request.args.get('name', '')
     col = request.args.get('col', '')
-    col = '`' + col.replace('`', '``') + '`'
-
-    sql = text(f"SELECT {col} AS val FROM fruit WHERE name = :name")
+    sql = vuln_sql(col)
     try:
         with engine.connect() as conn:
             rows = conn.execute(sql, { 'name': name }).mappings().all()
@@ -59,10 +66,7 @@ def vuln():
 def vuln_pg():
     name = request.args.get('name', '')
     col = request.args.get('col', '')
-#    col = '`' + col.replace('`', '``') + '`'
-    col = '"' + col.replace('"', '\\"') + '"'
-
-    sql = text(f"SELECT {col} FROM users WHERE name = :name")
+    sql = vuln_pg_sql(col)
     try:
         with engine_pg.connect() as conn:
             rows = conn.execute(sql, { "name": name }).all()
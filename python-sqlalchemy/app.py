@@ -1,6 +1,7 @@
 from flask import Flask, request, jsonify
 from sqlalchemy import create_engine, text
 import os
+import time
 
 app = Flask(__name__)
 
@@ -14,6 +15,9 @@ DB_USER = os.getenv("DB_USER", "app")
 DB_PASS = os.getenv("DB_PASS", "apppass")
 DB_NAME = os.getenv("DB_NAME", "demo")
 
+# most cases accepted by one /batch request
+BATCH_MAX = int(os.getenv("BATCH_MAX", "1000"))
+
 
 engine_pg = create_engine(
     f"postgresql+psycopg://{PG_USER}:{PG_PASS}@{PG_HOST}:5432/{PG_DB}",
@@ -49,22 +53,31 @@ def safe():
     try:
         with engine.connect() as conn:
             rows = conn.execute(sql, {"name": name}).mappings().all()
-        return jsonify(rows=list(rows))
+        return jsonify(rows=[dict(r) for r in rows])
     except Exception as e:
         return jsonify(error=str(e)), 500
 
 
+def vuln_sql(col):
+    col = "`" + col.replace("`", "``") + "`"
+    return text(f"SELECT {col} AS val FROM fruit WHERE name = :name")
+
+
+def vuln_pg_sql(col):
+    #    col = '`' + col.replace('`', '``') + '`'
+    col = '"' + col.replace('"', '\\"') + '"'
+    return text(f"SELECT {col} FROM users WHERE name = :name")
+
+
 @app.get("/vuln")
 def vuln():
     name = request.args.get("name", "")
     col = request.args.get("col", "")
-    col = "`" + col.replace("`", "``") + "`"
-
-    sql = text(f"SELECT {col} AS val FROM fruit WHERE name = :name")
+    sql = vuln_sql(col)
     try:
         with engine.connect() as conn:
             rows = conn.execute(sql, {"name": name}).mappings().all()
-        return jsonify(query=str(sql), rows=list(rows))
+        return jsonify(query=str(sql), rows=[dict(r) for r in rows])
     except Exception as e:
         return jsonify(query=str(sql), error=str(e)), 500
 
@@ -73,17 +86,51 @@ def vuln():
 def vuln_pg():
     name = request.args.get("name", "")
     col = request.args.get("col", "")
-    #    col = '`' + col.replace('`', '``') + '`'
-    col = '"' + col.replace('"', '\\"') + '"'
-
-    sql = text(f"SELECT {col} FROM users WHERE name = :name")
+    sql = vuln_pg_sql(col)
     try:
         with engine_pg.connect() as conn:
             rows = conn.execute(sql, {"name": name}).mappings().all()
-        return jsonify(query=str(sql), rows=list(rows))
+        return jsonify(query=str(sql), rows=[dict(r) for r in rows])
     except Exception as e:
         return jsonify(query=str(sql), error=str(e)), 500
 
 
+def run_batch(eng, build):
+    # The cases of one endpoint over a single pooled connection. A failed case
+    # rolls back its transaction (aborted on Postgres) so the next case starts
+    # clean; a broken connection is replaced on the next execute.
+    cases = request.get_json(silent=True)
+    if not isinstance(cases, list) or len(cases) > BATCH_MAX or not all(isinstance(c, dict) for c in cases):
+        return jsonify(error=f'expected a JSON array of at most {BATCH_MAX} {{"col", "name"}} objects'), 400
+    results = []
+    start = time.perf_counter()
+    try:
+        with eng.connect() as conn:
+            for case in cases:
+                sql = build(str(case.get("col", "")))
+                case_start = time.perf_counter()
+                try:
+                    rows = conn.execute(sql, {"name": str(case.get("name", ""))}).mappings().all()
+                    res = {"status": 200, "query": str(sql), "rows": [dict(r) for r in rows]}
+                except Exception as e:
+                    res = {"status": 500, "query": str(sql), "error": str(e)}
+                    conn.rollback()
+                res["ms"] = round((time.perf_counter() - case_start) * 1000, 3)
+                results.append(res)
+    except Exception as e:
+        return jsonify(error=str(e), results=results), 500
+    return jsonify(results=results, ms=round((time.perf_counter() - start) * 1000, 3))
+
+
+@app.post("/vuln/batch")
+def vuln_batch():
+    return run_batch(engine, vuln_sql)
+
+
+@app.post("/vuln-pg/batch")
+def vuln_pg_batch():
+    return run_batch(engine_pg, vuln_pg_sql)
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Benchmark of matcher.Matcher against find_matches() on a synthetic corpus of
+# source files. Both must produce identical findings for every file.
+import random
+import re
+import string
+import sys
+import time
+from argparse import ArgumentParser
+
+from matcher import Matcher
+from search_github import find_matches
+
+PATTERNS = [
+    r"knex\.raw\s*\(`.*\$\{.*`",
+    r"SELECT\s+\$\{col\}\s+FROM",
+    r"PDO::ATTR_EMULATE_PREPARES\s*=>\s*true",
+    r"->prepare\(\s*\"SELECT\s+\$",
+    r"sequelize\.query\(\s*`",
+    r"\.whereRaw\(\s*`[^`]*\$\{",
+    r"\.orderByRaw\(\s*[^)]*\+",
+    r"mysql\.format\(",
+    r"connection\.query\(\s*`[^`]*\$\{",
+    r"cursor\.execute\(\s*f[\"']",
+    r"text\(\s*f[\"']SELECT",
+    r"\.execute\(\s*\"SELECT .*\" *%",
+    r"createQueryBuilder\([^)]*\)\.where\(`",
+    r"db\.Raw\(\s*fmt\.Sprintf",
+    r"interpolateParams=true",
+    r"emulatePrepare\s*:\s*true",
+    r"ORDER BY \$\{",
+    r"GROUP BY \$\{",
+    r"find_by_sql\(\s*\"[^\"]*#\{",
+    r"exec_query\(\s*\"[^\"]*#\{",
+    r"\.pluck\(\s*params\[",
+    r"\.order\(\s*params\[",
+    r"jdbcTemplate\.query\(\s*\"[^\"]*\"\s*\+",
+    r"createStatement\(\)\.execute",
+    r"\bDB::raw\(\s*\$",
+    r"selectRaw\(\s*\$",
+    r"quoteIdentifier\(",
+    r"`\$\{[a-zA-Z_]+\}`",
+    r"\?#\\0",
+    r"\w+\s*=\s*request\.args\[",
+]
+
+WORDS = ["const", "let", "return", "function", "import", "from", "query", "select", "where", "user", "id",
+         "name", "table", "await", "async", "if", "else", "for", "value", "result", "db", "conn", "row"]
+
+
+def synthetic_file(rng: random.Random, lines: int, hit_rate: float) -> str:
+    out = []
+    for _ in range(lines):
+        if rng.random() < hit_rate:
+            out.append(rng.choice([
+                "  const rows = await knex.raw(`SELECT ${col} FROM fruit`);",
+                "  db.query(`SELECT ${col} FROM t ORDER BY ${order}`)",
+                "  cursor.execute(f\"SELECT {col} FROM t\")",
+                "  $pdo = new PDO($dsn, $u, $p, [PDO::ATTR_EMULATE_PREPARES => true]);",
+                "  User.where(\"name = ?\", name).order(params[:sort])",
+            ]))
+            continue
+        words = rng.choices(WORDS, k=rng.randint(2, 10))
+        ident = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+        out.append("    " + " ".join(words) + f" {ident}({rng.randint(0, 999)});")
+    return "\n".join(out)
+
+
+def bench(fn, files, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in files:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = ArgumentParser(description="Compare matcher.Matcher with find_matches()")
+    parser.add_argument("--files", type=int, default=500, help="Number of synthetic files")
+    parser.add_argument("--lines", type=int, default=300, help="Lines per file")
+    parser.add_argument("--hit-rate", type=float, default=0.001, help="Fraction of lines that contain a match")
+    parser.add_argument("--patterns", type=int, default=len(PATTERNS), help="Number of patterns to use")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(sys.argv[1:])
+
+    rng = random.Random(args.seed)
+    files = [synthetic_file(rng, args.lines, args.hit_rate) for _ in range(args.files)]
+    compiled = [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in PATTERNS[: args.patterns]]
+    matcher = Matcher(compiled)
+
+    mismatches = sum(find_matches(text, compiled) != matcher.find(text) for text in files)
+    size = sum(len(t) for t in files)
+    old = bench(lambda t: find_matches(t, compiled), files, args.repeat)
+    new = bench(matcher.find, files, args.repeat)
+    print(f"{len(files)} files, {size / 1e6:.1f} MB, {len(compiled)} patterns "
+          f"({sum(l is not None for l in matcher.literals)} with a literal prefilter)")
+    print(f"find_matches(): {old:.3f}s ({size / old / 1e6:.1f} MB/s)")
+    print(f"Matcher.find(): {new:.3f}s ({size / new / 1e6:.1f} MB/s), {old / new:.1f}x")
+    print(f"Identical findings: {len(files) - mismatches}/{len(files)}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
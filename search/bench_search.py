@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# Benchmark of GithubApi.search() and the repository scan loop against
+# fake_github.py (started as a subprocess per size, so its memory and CPU are
+# not counted). For each size it reports the requests the fake server saw,
+# wall time and peak traced memory of this process. tracemalloc slows the
+# client down severalfold, so each phase runs twice: a warm-up pass (traced
+# for the peak, which also fills the fake server's content caches) and an
+# untraced pass for requests and wall time. With --baseline, a previous --out
+# file is compared and the run fails on regressions.
+import json
+import re
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import requests
+
+from matcher import Matcher
+from ratelimit import RateLimiter
+from scanpool import ScanPool
+from search_github import GithubApi, resolve_metadata, scan_repo
+
+HERE = Path(__file__).resolve().parent
+PATTERNS = [r"knex\.raw\s*\(`.*\$\{", r"ORDER BY \$\{", r"cursor\.execute\(\s*f[\"']", r"ATTR_EMULATE_PREPARES\s*=>\s*true"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake(repos: int, args) -> tuple:
+    port, raw_port = free_port(), free_port()
+    cmd = [sys.executable, str(HERE / "fake_github.py"), "--port", str(port), "--raw-port", str(raw_port),
+           "--repos", str(repos), "--files", str(args.files), "--lines", str(args.lines),
+           "--latency", str(args.latency), "--error-rate", str(args.error_rate),
+           "--core-limit", "1000000", "--search-limit", "1000"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{base}/_stats", timeout=1)
+            break
+        except requests.RequestException:
+            time.sleep(0.1)
+    return proc, base, f"http://127.0.0.1:{raw_port}"
+
+
+def server_requests(base: str, reset: bool = True) -> int:
+    stats = requests.get(f"{base}/_stats", timeout=5).json()
+    if reset:
+        requests.get(f"{base}/_reset", timeout=5)
+    return sum(n for kind, n in stats.items() if kind != "304")
+
+
+def measure(fn, base: str, memory: bool):
+    peak = 0
+    if memory:
+        tracemalloc.start()
+    fn()
+    if memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    server_requests(base)
+    start = time.perf_counter()
+    result = fn()
+    wall = time.perf_counter() - start
+    return result, server_requests(base), round(wall, 3), round(peak / 1e6, 2)
+
+
+def scan_all(api: GithubApi, repos, args) -> dict:
+    # The scan loop of search_github.run(), minus the printing
+    opts = Namespace(archive=args.archive, max_bytes=200_000, max_files=2000)
+    resolve_metadata(api, repos, args.workers)
+    scanner = ScanPool(Matcher([re.compile(p, re.IGNORECASE | re.MULTILINE) for p in PATTERNS]), args.scan_processes, 64)
+    files = matches = failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as repo_pool, \
+            ThreadPoolExecutor(max_workers=args.workers) as file_pool:
+        futures = [repo_pool.submit(scan_repo, api, repo, scanner, opts, None, file_pool) for repo in repos]
+        for fut in as_completed(futures):
+            try:
+                scanned = fut.result()
+            except (requests.RequestException, OSError):
+                failed += 1
+                continue
+            files += len(scanned.files)
+            matches += len(scanned.hits())
+    scanner.close()
+    return {"files": files, "files_with_matches": matches, "failed": failed}
+
+
+def run_size(repos: int, args) -> dict:
+    proc, base, raw = start_fake(repos, args)
+    try:
+        server_requests(base)
+        api = GithubApi("bench", None, RateLimiter(), workers=args.workers, api_url=base, raw_url=raw)
+        found, sent, wall, peak = measure(lambda: api.search("bench"), base, args.memory)
+        search = {"repos": len(found), "requests": sent, "wall_s": wall, "peak_mb": peak}
+        found = sorted(found, key=lambda r: r.name)
+        counts, sent, wall, peak = measure(lambda: scan_all(api, found, args), base, args.memory)
+        scan = {**counts, "requests": sent, "wall_s": wall, "peak_mb": peak}
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {"search": search, "scan": scan}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for size, phases in results.items():
+        for phase, cur in phases.items():
+            old = baseline.get(size, {}).get(phase)
+            if not old:
+                continue
+            for key in ("requests", "wall_s", "peak_mb"):
+                if key in old and old[key] and cur[key] > old[key] * (1 + tolerance) + (0.05 if key == "wall_s" else 0):
+                    regressions.append(f"{size} repos, {phase}: {key} {old[key]} -> {cur[key]}")
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark search_github.py against fake_github.py")
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated repository counts")
+    parser.add_argument("--files", type=int, default=10, help="Files per repository")
+    parser.add_argument("--lines", type=int, default=200, help="Lines per file")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--scan-processes", type=int, default=0, help="Scanner processes (0 scans on the fetch threads)")
+    parser.add_argument("--archive", action="store_true", help="Scan from tarballs instead of raw files")
+    parser.add_argument("--latency", type=float, default=0.0, help="Injected latency per request in milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Do not trace the warm-up pass (peak_mb is reported as 0)")
+    parser.add_argument("--out", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="Results JSON of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative increase before flagging")
+    args = parser.parse_args()
+
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",")):
+        results[str(size)] = res = run_size(size, args)
+        s, c = res["search"], res["scan"]
+        print(f"{size:>5} repos  search: {s['requests']:>5} req {s['wall_s']:>7.2f}s {s['peak_mb']:>7.2f} MB   "
+              f"scan: {c['requests']:>6} req {c['wall_s']:>7.2f}s {c['peak_mb']:>7.2f} MB  "
+              f"({c['files']} files, {c['files_with_matches']} with matches, {c['failed']} failed)", flush=True)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {args.out}")
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
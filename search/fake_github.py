@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# Local stand-in for the parts of the GitHub API that search_github.py uses,
+# serving synthetic repositories: code search (Link pagination, rate-limit
+# headers), /repos/{name}, git refs, recursive trees, tarballs, GraphQL
+# repository lookups and raw content (on a second port, as a separate host).
+# Latency and 429s can be injected, raw paths listed in the handler's
+# fail_raw set ("<repo>/<path>") answer 500, tarballs of repos in cut_tarball
+# drop the connection halfway, and with link_on_304 off a 304 omits the Link
+# header (HTTP does not require it); /_stats returns request counts per
+# endpoint and /_reset clears them.
+import gzip
+import hashlib
+import io
+import json
+import random
+import re
+import tarfile
+import threading
+import time
+from argparse import ArgumentParser
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+HIT_LINES = [
+    "  const rows = await knex.raw(`SELECT ${col} FROM fruit WHERE name = ?`, [name]);",
+    "  return db.query(`SELECT * FROM users ORDER BY ${order}`);",
+    "  cursor.execute(f\"SELECT {col} FROM fruit\")",
+    "  $pdo = new PDO($dsn, $user, $pass, [PDO::ATTR_EMULATE_PREPARES => true]);",
+]
+WORDS = ["const", "let", "return", "function", "import", "from", "query", "select", "where", "user", "id",
+         "name", "table", "await", "async", "if", "else", "for", "value", "result", "db", "conn", "row"]
+
+
+def git_blob_sha(body: bytes) -> str:
+    return hashlib.sha1(b"blob %d\0" % len(body) + body).hexdigest()
+
+
+class World:
+    # Repository i is "bench/repo<i>"; every --change-every'th repo gets a new
+    # commit (and a changed first file) per --generation, to exercise
+    # incremental rescans
+    def __init__(self, repos: int, files: int, lines: int, hit_rate: float, results_per_repo: int,
+                 generation: int = 0, change_every: int = 10, seed: int = 1):
+        self.repos = repos
+        self.files = files
+        self.lines = lines
+        self.hit_rate = hit_rate
+        self.results_per_repo = results_per_repo
+        self.generation = generation
+        self.change_every = change_every
+        self.seed = seed
+
+    def name(self, i: int) -> str:
+        return f"bench/repo{i:05d}"
+
+    def index(self, full_name: str):
+        m = re.fullmatch(r"bench/repo(\d+)", full_name)
+        if not m or int(m.group(1)) >= self.repos:
+            return None
+        return int(m.group(1))
+
+    def gen(self, i: int) -> int:
+        return self.generation if self.change_every and i % self.change_every == 0 else 0
+
+    def commit(self, i: int) -> str:
+        return hashlib.sha1(f"commit:{self.seed}:{i}:{self.gen(i)}".encode()).hexdigest()
+
+    def tree_sha(self, i: int) -> str:
+        return hashlib.sha1(f"tree:{self.seed}:{i}:{self.gen(i)}".encode()).hexdigest()
+
+    def pushed_at(self, i: int) -> str:
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1_700_000_000 + i * 60 + self.gen(i) * 86_400))
+
+    def stars(self, i: int) -> int:
+        return 10_000 // (i + 1) + 1
+
+    def paths(self, i: int):
+        # every 10th file is an image, to exercise the binary-extension filter
+        return [f"assets/img{j}.png" if j % 10 == 9 else f"src/mod{j}.js" for j in range(self.files)]
+
+    @lru_cache(maxsize=16384)
+    def content(self, i: int, path: str) -> bytes:
+        j = int(re.search(r"(\d+)\.\w+$", path).group(1))
+        rng = random.Random(f"{self.seed}:{i}:{j}:{self.gen(i) if j == 0 else 0}")
+        if path.endswith(".png"):
+            return bytes(rng.getrandbits(8) for _ in range(256))
+        out = []
+        for _ in range(self.lines):
+            if rng.random() < self.hit_rate:
+                out.append(rng.choice(HIT_LINES))
+            else:
+                out.append("    " + " ".join(rng.choices(WORDS, k=rng.randint(2, 10))) + f"({rng.randint(0, 999)});")
+        return ("\n".join(out) + "\n").encode()
+
+    def tree(self, i: int) -> dict:
+        entries = [{"path": "src", "mode": "040000", "type": "tree", "sha": self.tree_sha(i)[:39] + "0"}]
+        for path in self.paths(i):
+            body = self.content(i, path)
+            entries.append({"path": path, "mode": "100644", "type": "blob", "sha": git_blob_sha(body), "size": len(body)})
+        return {"sha": self.tree_sha(i), "tree": entries, "truncated": False}
+
+    @lru_cache(maxsize=64)
+    def tarball(self, i: int) -> bytes:
+        prefix = f"{self.name(i).replace('/', '-')}-{self.commit(i)[:7]}/"
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w", format=tarfile.PAX_FORMAT,
+                          pax_headers={"comment": self.commit(i)}) as tar:
+            for path in self.paths(i):
+                body = self.content(i, path)
+                info = tarfile.TarInfo(prefix + path)
+                info.size = len(body)
+                tar.addfile(info, io.BytesIO(body))
+        return gzip.compress(buf.getvalue(), 1)
+
+    def search_items(self, page: int, per_page: int):
+        total = self.repos * self.results_per_repo
+        start = (page - 1) * per_page
+        items = []
+        for k in range(start, min(total, start + per_page)):
+            i, n = divmod(k, self.results_per_repo)
+            name = self.name(i)
+            items.append({
+                "name": f"mod{n}.js",
+                "path": f"src/mod{n}.js",
+                "html_url": f"https://github.com/{name}/blob/main/src/mod{n}.js",
+                "repository": {"full_name": name, "html_url": f"https://github.com/{name}"},
+            })
+        return items, total
+
+
+class Limits:
+    # Per-resource primary limits, counted like GitHub: 304s are free
+    def __init__(self, core: int, search: int, graphql: int, window: float):
+        self.limits = {"core": core, "search": search, "graphql": graphql}
+        # the search API is limited per minute, the others per --window
+        self.windows = {"core": window, "search": 60.0, "graphql": window}
+        self.used = {}
+        self.reset_at = {}
+        self.lock = threading.Lock()
+
+    def take(self, resource: str, free: bool = False):
+        with self.lock:
+            now = time.time()
+            if now >= self.reset_at.get(resource, 0):
+                self.reset_at[resource] = now + self.windows[resource]
+                self.used[resource] = 0
+            limit = self.limits[resource]
+            ok = self.used[resource] < limit
+            if ok and not free:
+                self.used[resource] += 1
+            return ok, {
+                "x-ratelimit-limit": str(limit),
+                "x-ratelimit-remaining": str(max(0, limit - self.used[resource])),
+                "x-ratelimit-reset": str(int(self.reset_at[resource]) + 1),
+                "x-ratelimit-resource": resource,
+            }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    world: World
+    limits: Limits
+    latency = 0.0
+    error_rate = 0.0
+    retry_after = 1
+    fail_raw = set()
+    cut_tarball = set()
+    link_on_304 = True
+    stats = {}
+    stats_lock = threading.Lock()
+    rng = random.Random(1)
+
+    def log_message(self, *args):
+        pass
+
+    def count(self, kind: str):
+        with self.stats_lock:
+            self.stats[kind] = self.stats.get(kind, 0) + 1
+
+    def send(self, code: int, body, ctype: str = "application/json", headers=None, cut: bool = False):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if cut:
+            # the full Content-Length, then the connection drops halfway
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def inject(self) -> bool:
+        if self.latency:
+            time.sleep(self.latency)
+        with self.stats_lock:
+            fail = self.error_rate and self.rng.random() < self.error_rate
+        if fail:
+            self.count("429")
+            self.send(429, {"message": "You have exceeded a secondary rate limit."},
+                      headers={"Retry-After": str(self.retry_after)})
+            return True
+        return False
+
+    def api_json(self, kind: str, resource: str, data, extra=None, code: int = 200):
+        # ETag/If-None-Match like the real API; a 304 does not use the budget
+        body = json.dumps(data).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        fresh = self.headers.get("If-None-Match") == etag
+        ok, headers = self.limits.take(resource, free=fresh)
+        headers.update(extra or {})
+        headers["ETag"] = etag
+        if not ok:
+            self.count("403")
+            return self.send(403, {"message": "API rate limit exceeded"}, headers=headers)
+        self.count(kind)
+        if fresh:
+            self.count("304")
+            if not self.link_on_304:
+                headers.pop("Link", None)
+            self.send_response(304)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send(code, body, headers=headers)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+        if path == "/_stats":
+            with self.stats_lock:
+                return self.send(200, dict(self.stats))
+        if path == "/_reset":
+            with self.stats_lock:
+                self.stats.clear()
+            return self.send(200, {})
+        if self.inject():
+            return
+        w = self.world
+        if self.server.kind == "raw":
+            m = re.fullmatch(r"/(bench/[^/]+)/([^/]+)/(.+)", path)
+            i = w.index(m.group(1)) if m else None
+            if i is None or m.group(3) not in w.paths(i):
+                return self.send(404, b"404: Not Found", "text/plain")
+            if f"{m.group(1)}/{m.group(3)}" in self.fail_raw:
+                self.count("raw_error")
+                return self.send(500, b"500: Internal Server Error", "text/plain")
+            self.count("raw")
+            return self.send(200, w.content(i, m.group(3)), "text/plain; charset=utf-8")
+
+        if path == "/search/code":
+            q = parse_qs(parts.query)
+            page = int(q.get("page", ["1"])[0])
+            per_page = min(100, int(q.get("per_page", ["30"])[0]))
+            items, total = w.search_items(page, per_page)
+            last = max(1, -(-total // per_page))
+            base = f"http://{self.headers['Host']}/search/code?q={q.get('q', [''])[0]}&per_page={per_page}"
+            links = []
+            if page < last:
+                links.append(f'<{base}&page={page + 1}>; rel="next"')
+                links.append(f'<{base}&page={last}>; rel="last"')
+            extra = {"Link": ", ".join(links)} if links else {}
+            return self.api_json("search", "search", {"total_count": total, "incomplete_results": False, "items": items}, extra)
+
+        m = re.fullmatch(r"/repos/(bench/[^/]+)(/.*)?", path)
+        i = w.index(m.group(1)) if m else None
+        if i is None:
+            return self.api_json("404", "core", {"message": "Not Found"}, code=404)
+        rest = m.group(2) or ""
+        if rest == "":
+            return self.api_json("repo", "core", {
+                "full_name": w.name(i), "html_url": f"https://github.com/{w.name(i)}",
+                "default_branch": "main", "pushed_at": w.pushed_at(i), "stargazers_count": w.stars(i),
+            })
+        if rest == "/git/refs/heads/main":
+            return self.api_json("refs", "core", {"ref": "refs/heads/main", "object": {"type": "commit", "sha": w.commit(i)}})
+        if rest.startswith("/git/trees/"):
+            return self.api_json("trees", "core", w.tree(i))
+        if rest.startswith("/tarball/"):
+            ok, headers = self.limits.take("core")
+            self.count("tarball")
+            return self.send(200, w.tarball(i), "application/x-gzip", headers, cut=w.name(i) in self.cut_tarball)
+        self.api_json("404", "core", {"message": "Not Found"}, code=404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.inject():
+            return
+        if self.server.kind != "api" or urlsplit(self.path).path != "/graphql":
+            return self.send(404, {"message": "Not Found"})
+        query = json.loads(body or b"{}").get("query", "")
+        w = self.world
+        data = {}
+        for alias, owner, name in re.findall(r'(\w+): repository\(owner: "([^"]*)", name: "([^"]*)"\)', query):
+            i = w.index(f"{owner}/{name}")
+            data[alias] = None if i is None else {
+                "stargazerCount": w.stars(i), "pushedAt": w.pushed_at(i),
+                "defaultBranchRef": {"name": "main", "target": {"oid": w.commit(i)}},
+            }
+        ok, headers = self.limits.take("graphql")
+        self.count("graphql")
+        self.send(200, {"data": data}, headers=headers)
+
+
+def serve(world: World, port: int, raw_port: int, latency: float = 0.0, error_rate: float = 0.0,
+          core_limit: int = 5000, search_limit: int = 30, graphql_limit: int = 5000, window: float = 3600,
+          host: str = "127.0.0.1"):
+    # Starts the API and raw servers on daemon threads and returns both
+    handler = type("FakeGithubHandler", (Handler,), {
+        "world": world, "limits": Limits(core_limit, search_limit, graphql_limit, window),
+        "latency": latency, "error_rate": error_rate, "stats": {}, "fail_raw": set(), "cut_tarball": set(),
+    })
+    servers = []
+    for kind, p in (("api", port), ("raw", raw_port)):
+        srv = ThreadingHTTPServer((host, p), handler)
+        srv.daemon_threads = True
+        srv.kind = kind
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+    return servers
+
+
+def main():
+    parser = ArgumentParser(description="Local fake of the GitHub API for search_github.py")
+    parser.add_argument("--port", type=int, default=8700, help="API port")
+    parser.add_argument("--raw-port", type=int, help="raw content port (default: --port + 1)")
+    parser.add_argument("--repos", type=int, default=100, help="Number of synthetic repositories")
+    parser.add_argument("--files", type=int, default=20, help="Files per repository")
+    parser.add_argument("--lines", type=int, default=200, help="Lines per file")
+    parser.add_argument("--hit-rate", type=float, default=0.002, help="Fraction of lines that contain a match")
+    parser.add_argument("--results-per-repo", type=int, default=1, help="Code search results per repository")
+    parser.add_argument("--generation", type=int, default=0, help="Bump to change every --change-every'th repo")
+    parser.add_argument("--change-every", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Added latency per request in milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429 + Retry-After")
+    parser.add_argument("--core-limit", type=int, default=5000, help="Core API requests per window")
+    parser.add_argument("--search-limit", type=int, default=30, help="Search API requests per window")
+    parser.add_argument("--window", type=float, default=3600, help="Core/GraphQL rate-limit window in seconds (search: 60)")
+    args = parser.parse_args()
+
+    world = World(args.repos, args.files, args.lines, args.hit_rate, args.results_per_repo,
+                  args.generation, args.change_every)
+    raw_port = args.raw_port or args.port + 1
+    serve(world, args.port, raw_port, args.latency / 1000, args.error_rate,
+          args.core_limit, args.search_limit, window=args.window)
+    print(f"Fake GitHub API on http://127.0.0.1:{args.port} (raw content on http://127.0.0.1:{raw_port})", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# Persistent HTTP cache for search_github.py: URL -> validators, the
+# response headers callers rely on (e.g. Link) and blob.
+# Bodies are stored once under their git blob SHA in <root>/blobs, so a raw
+# file whose SHA is in a tree listing can be served without any request. The
+# URL index and LRU bookkeeping live in <root>/index.sqlite; once the blobs
+# exceed max_bytes the least recently used ones are evicted.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+
+def git_blob_sha(body: bytes) -> str:
+    # Same hash git uses for blobs, so raw files line up with tree entries
+    return hashlib.sha1(b"blob %d\0" % len(body) + body).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    headers: Optional[Dict[str, str]]  # None for entries stored before headers were kept
+
+
+class HttpCache:
+    def __init__(self, root: Path, max_bytes: int = 512 * 1024 * 1024):
+        self.root = Path(root).expanduser()
+        self.blob_dir = self.root / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evicted = 0
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False)
+        self.__db.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (key TEXT PRIMARY KEY, size INTEGER, atime REAL);
+            CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, key TEXT,
+                                             headers TEXT);
+            CREATE INDEX IF NOT EXISTS blobs_atime ON blobs(atime);
+        """)
+        columns = {row[1] for row in self.__db.execute("PRAGMA table_info(urls)")}
+        if "headers" not in columns:
+            # index created before headers were kept
+            self.__db.execute("ALTER TABLE urls ADD COLUMN headers TEXT")
+        self.size = self.__db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def __blob_path(self, key: str) -> Path:
+        return self.blob_dir / key[:2] / key[2:]
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        with self.__lock:
+            row = self.__db.execute(
+                "SELECT u.key, u.etag, u.last_modified, u.headers FROM urls u JOIN blobs b ON b.key = u.key "
+                "WHERE u.url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        key, etag, last_modified, headers = row
+        return CacheEntry(key, etag, last_modified, json.loads(headers) if headers is not None else None)
+
+    def get_blob(self, key: str) -> Optional[bytes]:
+        try:
+            body = self.__blob_path(key).read_bytes()
+        except OSError:
+            return None
+        with self.__lock:
+            self.__db.execute("UPDATE blobs SET atime = ? WHERE key = ?", (time.time(), key))
+            self.__db.commit()
+        return body
+
+    def put_blob(self, body: bytes) -> str:
+        key = git_blob_sha(body)
+        path = self.__blob_path(key)
+        with self.__lock:
+            known = self.__db.execute("SELECT 1 FROM blobs WHERE key = ?", (key,)).fetchone()
+            if not known or not path.exists():
+                path.parent.mkdir(exist_ok=True)
+                tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp.write_bytes(body)
+                os.replace(tmp, path)
+                if not known:
+                    self.size += len(body)
+            self.__db.execute("INSERT OR REPLACE INTO blobs (key, size, atime) VALUES (?, ?, ?)",
+                              (key, len(body), time.time()))
+            self.__evict()
+            self.__db.commit()
+        return key
+
+    def store(self, url: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None,
+              headers: Optional[Dict[str, str]] = None) -> str:
+        key = self.put_blob(body)
+        with self.__lock:
+            self.__db.execute("INSERT OR REPLACE INTO urls (url, etag, last_modified, key, headers) "
+                              "VALUES (?, ?, ?, ?, ?)", (url, etag, last_modified, key, json.dumps(headers or {})))
+            self.__db.commit()
+        return key
+
+    def __evict(self):
+        # caller holds the lock
+        while self.size > self.max_bytes:
+            row = self.__db.execute("SELECT key, size FROM blobs ORDER BY atime LIMIT 1").fetchone()
+            if row is None:
+                break
+            key, size = row
+            self.__db.execute("DELETE FROM blobs WHERE key = ?", (key,))
+            self.__db.execute("DELETE FROM urls WHERE key = ?", (key,))
+            self.__blob_path(key).unlink(missing_ok=True)
+            self.size -= size
+            self.evicted += 1
+
+    def count(self, hit: bool, revalidated: bool = False):
+        with self.__lock:
+            if hit:
+                self.hits += 1
+                self.revalidated += revalidated
+            else:
+                self.misses += 1
+
+    def summary(self) -> str:
+        return (f"HTTP cache: {self.hits} hits ({self.revalidated} revalidated with 304), {self.misses} misses, "
+                f"{self.evicted} evicted, {self.size / 1e6:.1f} MB stored")
+
+    def close(self):
+        with self.__lock:
+            self.__db.close()
@@ -0,0 +1,107 @@
+# Multi-pattern matcher for search_github.py, same output as find_matches().
+# For every pattern the longest run of literals that any match must contain is
+# extracted from the parsed regex. The prefilter looks each distinct literal up
+# once per file with str.find() on a single lowercased copy (an alternation of
+# all literals in one regex is slower: sre has no multi-literal search).
+# Patterns whose literal is absent are skipped; when the literal is the
+# pattern's prefix, the full regex starts at its first occurrence instead of
+# the start of the file.
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+LITERAL = sre_parse.LITERAL
+SUBPATTERN = sre_parse.SUBPATTERN
+
+
+def _flatten(items):
+    # Plain groups are required as a whole, so their items join the sequence
+    for op, av in items:
+        if op is SUBPATTERN and av[1] == 0 and av[2] == 0:
+            yield from _flatten(av[3])
+        else:
+            yield op, av
+
+
+def required_literal(pattern: re.Pattern) -> Tuple[str, bool]:
+    # (longest literal every match contains, whether it starts the match);
+    # ("", False) if the pattern has no top-level literal
+    try:
+        items = list(_flatten(sre_parse.parse(pattern.pattern, pattern.flags)))
+    except Exception:
+        return "", False
+    best, best_start = "", -1
+    run, start = [], 0
+    for i, (op, av) in enumerate(items + [(None, None)]):
+        if op is LITERAL:
+            if not run:
+                start = i
+            run.append(chr(av))
+            continue
+        if len(run) > len(best):
+            best, best_start = "".join(run), start
+        run = []
+    return best, best_start == 0
+
+
+def snippet(text: str, m: re.Match) -> str:
+    # capture small context
+    start = max(0, m.start() - 40)
+    end = min(len(text), m.end() + 40)
+    return text[start:end].replace("\n", " ")
+
+
+class Matcher:
+    def __init__(self, patterns: Sequence[Union[str, re.Pattern]], flags: int = re.IGNORECASE | re.MULTILINE):
+        self.patterns = [p if isinstance(p, re.Pattern) else re.compile(p, flags) for p in patterns]
+        self.literals: List[Optional[Tuple[str, bool]]] = []  # per pattern, None = always run
+        self.anchored: List[bool] = []
+        self.needles: Dict[Tuple[str, bool], Optional[re.Pattern]] = {}
+        for pat in self.patterns:
+            lit, anchored = required_literal(pat)
+            if not lit:
+                self.literals.append(None)
+                self.anchored.append(False)
+                continue
+            key = (lit, bool(pat.flags & re.IGNORECASE))
+            # Outside ASCII, re's case folding (e.g. "s" ~ U+017F) is not str.lower()
+            self.needles[key] = re.compile(re.escape(lit), re.IGNORECASE) if key[1] else None
+            self.literals.append(key)
+            self.anchored.append(anchored)
+
+    def first_positions(self, text: str) -> Dict[Tuple[str, bool], int]:
+        found: Dict[Tuple[str, bool], int] = {}
+        ascii_text = text.isascii()
+        lowered = None
+        for (lit, icase), rx in self.needles.items():
+            if not icase:
+                pos = text.find(lit)
+            elif ascii_text and lit.isascii():
+                if lowered is None:
+                    lowered = text.lower()
+                pos = lowered.find(lit.lower())
+            else:
+                m = rx.search(text)
+                pos = m.start() if m else -1
+            if pos >= 0:
+                found[(lit, icase)] = pos
+        return found
+
+    def find(self, text: str) -> Dict[str, List[str]]:
+        found = self.first_positions(text)
+        findings: Dict[str, List[str]] = {}
+        for pat, lit, anchored in zip(self.patterns, self.literals, self.anchored):
+            if lit is None:
+                pos = 0
+            elif lit not in found:
+                continue
+            else:
+                pos = found[lit] if anchored else 0
+            hits = [snippet(text, m) for m in pat.finditer(text, pos)]
+            if hits:
+                findings[pat.pattern] = hits
+        return findings
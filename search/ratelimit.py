@@ -0,0 +1,145 @@
+# Rate-limit-aware request scheduler shared by all GithubApi worker threads.
+# Every request takes a token from the bucket of its host (the search and
+# GraphQL APIs have their own limits, so they get their own buckets). A bucket
+# enforces two things:
+#  - the primary budget: once a response carries x-ratelimit-remaining/-reset,
+#    requests go out while budget is left and wait for the reset once it is
+#    spent, so the whole budget is usable without pacing. Each request is
+#    charged when it is sent; the server's count replaces the local one when
+#    a response reports it (less the requests still in flight), and a 304,
+#    which GitHub does not count, gives its token back;
+#  - an optional request rate (token bucket), for documented secondary limits
+#    such as 900 REST requests per minute on api.github.com.
+# A 429, or a 403 with retry-after, an exhausted budget or a secondary rate
+# limit message, blocks the bucket for every worker until the stated time.
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+# requests per second; hosts not listed are only limited by their headers
+DEFAULT_RATES = {"api.github.com": 15.0}
+
+
+def bucket_for(url: str) -> str:
+    parts = urlsplit(url)
+    if parts.path.startswith("/search/"):
+        return f"{parts.netloc}/search"
+    if parts.path == "/graphql":
+        return f"{parts.netloc}/graphql"
+    return parts.netloc
+
+
+class Bucket:
+    def __init__(self, rate: Optional[float], burst: int):
+        self.rate = rate  # tokens per second, None = unthrottled
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.remaining: Optional[int] = None  # primary budget left, None = unknown
+        self.limit: Optional[int] = None
+        self.reset_at = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0.0
+
+    def refill(self, now: float):
+        if self.rate is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.remaining is not None and now >= self.reset_at:
+            # New window: the full limit, until a response states the next reset
+            self.remaining = self.limit
+            self.reset_at = float("inf")
+
+
+class RateLimiter:
+    def __init__(self, burst: int = 8, rates: Optional[Dict[str, float]] = None,
+                 notify: Optional[Callable[[str], None]] = None):
+        self.burst = burst
+        self.rates = DEFAULT_RATES if rates is None else rates
+        self.notify = notify
+        self.__buckets: Dict[str, Bucket] = {}
+        self.__cond = threading.Condition()
+
+    def __bucket(self, name: str) -> Bucket:
+        if name not in self.__buckets:
+            self.__buckets[name] = Bucket(self.rates.get(name), self.burst)
+        return self.__buckets[name]
+
+    def acquire(self, url: str):
+        name = bucket_for(url)
+        start = time.monotonic()
+        with self.__cond:
+            b = self.__bucket(name)
+            while True:
+                now = time.monotonic()
+                b.refill(now)
+                if now < b.blocked_until:
+                    wait = b.blocked_until - now
+                elif b.remaining is not None and b.remaining <= 0:
+                    wait = b.reset_at - now
+                elif b.rate is not None and b.tokens < 1:
+                    wait = (1 - b.tokens) / b.rate
+                else:
+                    b.tokens -= 1
+                    b.requests += 1
+                    b.in_flight += 1
+                    if b.remaining is not None:
+                        b.remaining -= 1
+                    b.waited += now - start
+                    return
+                self.__cond.wait(max(wait, 0.001))
+
+    def release(self, url: str):
+        # A request that got no response (connection error)
+        with self.__cond:
+            b = self.__bucket(bucket_for(url))
+            b.in_flight = max(0, b.in_flight - 1)
+            self.__cond.notify_all()
+
+    def update(self, url: str, status: int, headers, body: str = "") -> bool:
+        # Returns True when the response was a rate-limit rejection that
+        # should be retried once the bucket unblocks
+        name = bucket_for(url)
+        now = time.monotonic()
+        retry_after = headers.get("retry-after")
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        with self.__cond:
+            b = self.__bucket(name)
+            b.in_flight = max(0, b.in_flight - 1)
+            if remaining is not None and reset is not None:
+                if headers.get("x-ratelimit-limit"):
+                    b.limit = int(headers["x-ratelimit-limit"])
+                b.reset_at = now + max(1.0, int(reset) - time.time())
+                # The server's count is authoritative (it goes up again after a
+                # run of 304s); requests sent after this one are not in it yet
+                b.remaining = max(0, int(remaining) - b.in_flight)
+            elif status == 304 and b.remaining is not None:
+                b.remaining += 1
+            exhausted = int(remaining) == 0 if remaining is not None else b.remaining == 0
+            secondary = status == 403 and "secondary rate limit" in body.lower()
+            limited = status == 429 or (status == 403 and (retry_after is not None or exhausted or secondary))
+            if limited:
+                b.throttled += 1
+                if retry_after is not None:
+                    delay = float(retry_after)
+                elif exhausted and not secondary:
+                    delay = max(1.0, b.reset_at - now)
+                else:
+                    delay = 60.0  # secondary limit without retry-after: wait at least a minute
+                b.blocked_until = max(b.blocked_until, now + delay)
+                if self.notify:
+                    self.notify(f"Rate limit hit on {name}. Waiting {delay:.0f}s...")
+            self.__cond.notify_all()
+        return limited
+
+    def summary(self) -> str:
+        with self.__cond:
+            parts = [f"{name}: {b.requests} requests, {b.throttled} throttled, {b.waited:.1f}s waited"
+                     + (f", {b.remaining} remaining" if b.remaining is not None else "")
+                     for name, b in sorted(self.__buckets.items())]
+        return "Rate limits: " + ("; ".join(parts) if parts else "no requests")
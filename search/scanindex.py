@@ -0,0 +1,71 @@
+# Local index of scanned repositories for incremental rescans.
+# Per repo it keeps pushed_at, the branch head and tree SHA, and for every
+# scanned file its git blob SHA and findings. Findings only depend on the file
+# content and the scan settings, so they are reused for any blob SHA seen
+# before; a change of patterns or limits invalidates the stored repos.
+# A repo with files that could not be fetched is stored without pushed_at,
+# head and tree SHA, so the next run rescans it; the files that were fetched
+# are still reused by blob SHA, so only the missing ones are requested again.
+import hashlib
+import json
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+Findings = Dict[str, List[str]]
+
+
+@dataclass
+class IndexedRepo:
+    name: str
+    pushed_at: Optional[str]
+    commit_sha: str
+    tree_sha: Optional[str]
+    files: Dict[str, Tuple[str, Findings]] = field(default_factory=dict)  # path -> (blob sha, findings)
+    failed: List[str] = field(default_factory=list)  # paths whose fetch failed in this scan
+
+    def hits(self) -> Dict[str, Findings]:
+        return {path: found for path, (_, found) in self.files.items() if found}
+
+    def by_blob(self) -> Dict[str, Findings]:
+        return {sha: found for sha, found in self.files.values()}
+
+
+class ScanIndex:
+    def __init__(self, path: Path, patterns: List[str], max_bytes: int, max_files: int):
+        path = Path(path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        settings = json.dumps([sorted(patterns), max_bytes, max_files])
+        self.settings = hashlib.sha256(settings.encode()).hexdigest()[:16]
+        self.__db = sqlite3.connect(str(path))
+        self.__db.executescript("""
+            CREATE TABLE IF NOT EXISTS repos (name TEXT PRIMARY KEY, settings TEXT, pushed_at TEXT,
+                                              commit_sha TEXT, tree_sha TEXT, scanned_at REAL);
+            CREATE TABLE IF NOT EXISTS files (repo TEXT, path TEXT, blob_sha TEXT, findings TEXT,
+                                              PRIMARY KEY (repo, path));
+        """)
+
+    def get(self, name: str) -> Optional[IndexedRepo]:
+        row = self.__db.execute("SELECT pushed_at, commit_sha, tree_sha FROM repos WHERE name = ? AND settings = ?",
+                                (name, self.settings)).fetchone()
+        if row is None:
+            return None
+        repo = IndexedRepo(name, *row)
+        for path, sha, found in self.__db.execute("SELECT path, blob_sha, findings FROM files WHERE repo = ?", (name,)):
+            repo.files[path] = (sha, json.loads(found))
+        return repo
+
+    def put(self, repo: IndexedRepo):
+        state = (None, None, None) if repo.failed else (repo.pushed_at, repo.commit_sha, repo.tree_sha)
+        with self.__db:
+            self.__db.execute("INSERT OR REPLACE INTO repos VALUES (?, ?, ?, ?, ?, ?)",
+                              (repo.name, self.settings, *state, time.time()))
+            self.__db.execute("DELETE FROM files WHERE repo = ?", (repo.name,))
+            self.__db.executemany("INSERT INTO files VALUES (?, ?, ?, ?)",
+                                  [(repo.name, path, sha, json.dumps(found))
+                                   for path, (sha, found) in repo.files.items()])
+
+    def close(self):
+        self.__db.close()
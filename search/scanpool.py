@@ -0,0 +1,59 @@
+# CPU stage of the search_github.py scan pipeline.
+# Fetcher threads submit file contents and get an AsyncResult back right away,
+# so they can go on fetching while a pool of scanner processes runs the
+# patterns. At most queue_size files are in flight (queued or being scanned);
+# submit() blocks beyond that, which stalls the fetchers and keeps memory flat.
+import multiprocessing
+import re
+import threading
+from typing import Dict, List, Tuple, Union
+
+from matcher import Matcher
+
+_MATCHER = None
+
+
+def _init(patterns: List[Tuple[str, int]]):
+    global _MATCHER
+    _MATCHER = Matcher([re.compile(p, flags) for p, flags in patterns])
+
+
+def _scan(data: Union[str, bytes]) -> Dict[str, List[str]]:
+    if isinstance(data, bytes):
+        data = data.decode("utf-8", errors="replace")
+    return _MATCHER.find(data)
+
+
+class _Done:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self, timeout=None):
+        return self.value
+
+
+class ScanPool:
+    def __init__(self, matcher: Matcher, processes: int = 0, queue_size: int = 64):
+        self.matcher = matcher
+        self.processes = processes
+        self.__slots = threading.BoundedSemaphore(max(1, queue_size))
+        self.__pool = None
+        if processes > 0:
+            patterns = [(p.pattern, p.flags) for p in matcher.patterns]
+            self.__pool = multiprocessing.Pool(processes, initializer=_init, initargs=(patterns,))
+
+    def __release(self, _):
+        self.__slots.release()
+
+    def submit(self, data: Union[str, bytes]):
+        if self.__pool is None:
+            if isinstance(data, bytes):
+                data = data.decode("utf-8", errors="replace")
+            return _Done(self.matcher.find(data))
+        self.__slots.acquire()
+        return self.__pool.apply_async(_scan, (data,), callback=self.__release, error_callback=self.__release)
+
+    def close(self):
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool.join()
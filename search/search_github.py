@@ -1,12 +1,30 @@
 from dataclasses import dataclass
 from argparse import ArgumentParser
-from typing import Iterable, Dict, List, Set, Tuple
+from typing import Iterable, Dict, List, Optional, Set, Tuple
+import json
+import os
 import sys
 import re
+import tarfile
+import http.client
 import click
 import requests
+import urllib3
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 from urllib.parse import unquote_plus, quote
+from ghcache import HttpCache, git_blob_sha
+from matcher import Matcher
+from scanpool import ScanPool
+from ratelimit import RateLimiter
+from scanindex import IndexedRepo, ScanIndex
+
+# response headers kept with cached bodies: a 304 need not repeat them
+CACHED_HEADERS = ("link", "content-type")
+
+# quick skip of binaries by extension
+BINARY_EXT = re.compile(r"\.(png|jpg|jpeg|gif|pdf|zip|gz|ico|lock|min\.js)$", re.I)
 
 @dataclass
 class Repository:
@@ -14,6 +32,10 @@ class Repository:
     result_urls: set[str]
     url: str
     stars: int = -1
+    # filled in by the batched metadata lookup, otherwise resolved over REST while scanning
+    default_branch: Optional[str] = None
+    head_sha: Optional[str] = None
+    pushed_at: Optional[str] = None
 
     def __str__(self):
         return "{name}\n - stars: {stars},\n - url: {url},\n - results: {results_url}".format(
@@ -29,79 +51,198 @@ class Repository:
     def __eq__(self, other):
         return self.url == other.url
 
+    @staticmethod
+    def add_search_results(repos: Dict[str, "Repository"], search_results: list):
+        for result in search_results:
+            result_url = result["html_url"]
+            repo_data = result["repository"]
+            repository = Repository(
+                name=repo_data["full_name"],
+                result_urls= {result_url},
+                url=repo_data["html_url"],
+                stars=repo_data["stargazers_count"] if "stargazers_count" in repo_data else -1,
+            )
+            if repository.url in repos:
+                repos[repository.url].result_urls |= repository.result_urls
+            else:
+                repos[repository.url] = repository
+
     @staticmethod
     def repos_from_search(search_results: list) -> set["Repository"]:
         repos: dict[str, Repository] = {}
-        with click.progressbar(search_results, label="Parsing query results") as bar:
-            for result in search_results:
-                result_url = result["html_url"]
-                repo_data = result["repository"]
-                repository = Repository(
-                    name=repo_data["full_name"],
-                    result_urls= {result_url},
-                    url=repo_data["html_url"],
-                    stars=repo_data["stargazers_count"] if "stargazers_count" in repo_data else -1,
-                )
-                if repository.url in repos:
-                    repos[repository.url].result_urls |= repository.result_urls
-                else:
-                    repos[repository.url] = repository
-                bar.update(1)
+        Repository.add_search_results(repos, search_results)
         return set(repos.values())
 
+class ResultSink:
+    # --out: one JSON line per repository, flushed as soon as the repository
+    # is done, plus a compact <out>.summary.json written at the end
+    def __init__(self, path: Path, query: str, patterns: List[str]):
+        self.path = path
+        self.summary_path = path.with_name(path.stem + ".summary.json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.__fh = path.open("w", encoding="utf-8")
+        self.__started = time.time()
+        self.summary = {
+            "query": query,
+            "patterns": patterns,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.__started)),
+            "repos_found": 0,
+            "repos_selected": 0,
+            "repos_written": 0,
+            "repos_failed": 0,
+            "repos_unchanged": 0,
+            "repos_with_matches": 0,
+            "files_scanned": 0,
+            "files_failed": 0,
+            "files_with_matches": 0,
+            "files_by_pattern": {p: 0 for p in patterns},
+        }
+
+    def write(self, record: dict):
+        self.__fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.__fh.flush()
+        summary = self.summary
+        summary["repos_written"] += 1
+        summary["repos_failed"] += record.get("status") == "failed"
+        summary["repos_unchanged"] += record.get("status") == "unchanged"
+        summary["files_scanned"] += record.get("files_scanned", 0)
+        summary["files_failed"] += len(record.get("files_failed") or [])
+        matches = record.get("matches") or {}
+        summary["repos_with_matches"] += bool(matches)
+        summary["files_with_matches"] += len(matches)
+        for pats in matches.values():
+            for pat in pats:
+                summary["files_by_pattern"][pat] = summary["files_by_pattern"].get(pat, 0) + 1
+
+    def close(self):
+        self.__fh.close()
+        self.summary["elapsed_s"] = round(time.time() - self.__started, 3)
+        with self.summary_path.open("w", encoding="utf-8") as fh:
+            json.dump(self.summary, fh, ensure_ascii=False, indent=2)
+            fh.write("\n")
+
 class GithubApi:
-    def __init__(self, token):
+    def __init__(self, token, cache: Optional[HttpCache] = None, limiter: Optional[RateLimiter] = None,
+                 workers: int = 1, api_url: str = "https://api.github.com",
+                 raw_url: str = "https://raw.githubusercontent.com"):
+        self.api_url = api_url.rstrip("/")
+        self.raw_url = raw_url.rstrip("/")
+        self.cache = cache
+        self.limiter = limiter or RateLimiter(notify=lambda msg: click.secho(f"\r{msg}", fg="red"))
         self.__session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(10, workers))
+        self.__session.mount("https://", adapter)
+        self.__session.mount("http://", adapter)
         self.__session.headers = {
             "Accept": "application/vnd.github+json",
             "Authorization": f"Bearer {token}",
             "X-GitHub-Api-Version": "2022-11-28"
         }
 
-    def search(self, query: str) -> set[Repository]:
-        url = f"https://api.github.com/search/code?q={query}&per_page=100"
+    @staticmethod
+    def _cached_response(response: Optional[requests.Response], url: str, body: bytes,
+                         headers: Optional[dict] = None) -> requests.Response:
+        r = response if response is not None else requests.Response()
+        # stored headers, overridden by whatever the 304 sent again
+        merged = requests.structures.CaseInsensitiveDict(headers or {})
+        merged.update(r.headers)
+        r.headers = merged
+        r.status_code = 200
+        r.url = url
+        r._content = body
+        r.encoding = "utf-8"
+        return r
+
+    def _send(self, url: str, timeout: int, headers: Optional[dict] = None, stream: bool = False,
+              json_body: Optional[dict] = None) -> requests.Response:
+        # Every request goes through the shared scheduler; rate-limit
+        # rejections block the host's bucket for all workers and are retried
+        while True:
+            self.limiter.acquire(url)
+            try:
+                if json_body is not None:
+                    r = self.__session.post(url, timeout=timeout, headers=headers, json=json_body)
+                else:
+                    r = self.__session.get(url, timeout=timeout, headers=headers, stream=stream)
+            except requests.RequestException:
+                self.limiter.release(url)
+                raise
+            # a secondary rate limit 403 only says so in its body
+            body = r.text if r.status_code == 403 else ""
+            if not self.limiter.update(url, r.status_code, r.headers, body):
+                return r
+            r.close()
+
+    def _get(self, url: str, timeout: int, blob_sha: Optional[str] = None) -> requests.Response:
+        # Conditional GET through the cache; 304s do not count against the
+        # primary rate limit. A known git blob SHA is served without a request.
+        cache = self.cache
+        if cache is None:
+            return self._send(url, timeout)
+        if blob_sha:
+            body = cache.get_blob(blob_sha)
+            if body is not None:
+                cache.count(hit=True)
+                return self._cached_response(None, url, body)
+        entry = cache.lookup(url)
+        if entry and entry.headers is None:
+            entry = None  # stored without its headers: fetch in full once
+        headers = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        r = self._send(url, timeout, headers)
+        if r.status_code == 304 and entry:
+            body = cache.get_blob(entry.key)
+            if body is not None:
+                cache.count(hit=True, revalidated=True)
+                return self._cached_response(r, url, body, entry.headers)
+            r = self._send(url, timeout)  # blob evicted meanwhile
+        cache.count(hit=False)
+        if r.status_code == 200:
+            cache.store(url, r.content, r.headers.get("etag"), r.headers.get("last-modified"),
+                        {k: r.headers[k] for k in CACHED_HEADERS if k in r.headers})
+        return r
+
+    def iter_search_pages(self, query: str) -> Iterable[list]:
+        # Yields the items of one result page at a time
+        url = f"{self.api_url}/search/code?q={query}&per_page=100"
         next_page_pattern = re.compile(r'(?<=<)([\S]*)(?=>; rel=\"next\")', re.IGNORECASE)
         pages_fetched = 0
-        pages_remaining = True
-        results = []
-        while pages_remaining:
+        while True:
             try:
-                response = self.__session.get(url, timeout=30)
-                # Basic rate-limit handling using reset header if present
-                requests_remaining = int(response.headers.get("x-ratelimit-remaining", "1"))
-                if response.status_code == 429 or requests_remaining == 0:
-                    reset = int(response.headers.get("x-ratelimit-reset", str(int(time.time()) + 60)))
-                    sleep_for = max(1, reset - int(time.time()))
-                    click.secho(f"\rRate limit hit. Sleeping {sleep_for}s until reset...", fg="red")
-                    time.sleep(min(sleep_for, 90))
-                    continue
+                # rate limits are handled by the scheduler in _send()
+                response = self._get(url, timeout=30)
                 result = response.json()["items"]
             except requests.RequestException:
                 print("Request failed.")
-                return set()
-            except KeyError:
-                return set()
-            else:
-                pages_fetched += 1
-                results.extend(result)
-                if "link" not in response.headers:
-                    break
-                link_header = response.headers["link"]
-                pages_remaining = ('rel=\"next\"' in link_header)
-                if (pages_remaining):
-                    click.secho(f"\rMore results remaining. Fetched {pages_fetched} pages. Fetching next page of results...", fg="yellow", nl=False)
-                    match = next_page_pattern.search(link_header)
-                    if match:
-                        url = unquote_plus(match[0])
-                    else:
-                        break # failed to extract the next page, better exit
-        click.secho("\nSuccess! Parsing query results.", fg="green")
-        return Repository.repos_from_search(results)
+                return
+            except (KeyError, ValueError):
+                return
+            pages_fetched += 1
+            yield result
+            link_header = response.headers.get("link", "")
+            if 'rel=\"next\"' not in link_header:
+                return
+            click.secho(f"\rMore results remaining. Fetched {pages_fetched} pages. Fetching next page of results...", fg="yellow", nl=False)
+            match = next_page_pattern.search(link_header)
+            if not match:
+                return # failed to extract the next page, better exit
+            url = unquote_plus(match[0])
+
+    def search(self, query: str) -> set[Repository]:
+        # Pages are merged into repositories as they arrive; raw items are not kept
+        repos: Dict[str, Repository] = {}
+        for items in self.iter_search_pages(query):
+            Repository.add_search_results(repos, items)
+        click.secho("\nSuccess! Parsed query results.", fg="green")
+        return set(repos.values())
 
     def star_count(self, repo_name: str) -> int:
-        url =  "https://api.github.com/repos/" + repo_name
+        url = f"{self.api_url}/repos/{repo_name}"
         try:
-            response = self.__session.get(url, timeout=30)
+            response = self._get(url, timeout=30)
             return response.json()["stargazers_count"]
         except requests.RequestException:
             print("Request failed.")
@@ -109,32 +250,90 @@ class GithubApi:
         except KeyError:
             return -1
 
+    def repo_metadata(self, names: List[str]) -> Dict[str, dict]:
+        # One GraphQL request for a batch of repositories (up to ~100); repos
+        # that cannot be resolved are left out so the caller falls back to REST
+        fields = []
+        for i, name in enumerate(names):
+            owner, repo = name.split("/", 1)
+            fields.append(f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) "
+                          "{ stargazerCount pushedAt defaultBranchRef { name target { oid } } }")
+        r = self._send(f"{self.api_url}/graphql", 60, json_body={"query": "query { " + " ".join(fields) + " }"})
+        r.raise_for_status()
+        body = r.json()
+        data = (body.get("data") if isinstance(body, dict) else None) or {}
+        found = {}
+        for i, name in enumerate(names):
+            node = data.get(f"r{i}")
+            if not isinstance(node, dict):
+                continue
+            # A partial node (fields dropped by a GraphQL error) is left to REST as well
+            stars, pushed_at = node.get("stargazerCount"), node.get("pushedAt")
+            if not isinstance(stars, int) or not pushed_at:
+                continue
+            ref = node.get("defaultBranchRef") or {}
+            found[name] = {
+                "stars": stars,
+                "pushed_at": pushed_at,
+                "default_branch": ref.get("name"),
+                "head_sha": (ref.get("target") or {}).get("oid"),
+            }
+        return found
+
     def default_branch_and_sha(self, full_name: str) -> Tuple[str, str]:
-        url = f"https://api.github.com/repos/{full_name}"
-        r = self.__session.get(url, timeout=30)
+        url = f"{self.api_url}/repos/{full_name}"
+        r = self._get(url, timeout=30)
         r.raise_for_status()
         data = r.json()
         return data["default_branch"], data["pushed_at"]  # pushed_at as cache buster only
 
     def get_branch_sha(self, full_name: str, branch: str) -> str:
-        url = f"https://api.github.com/repos/{full_name}/git/refs/heads/{branch}"
-        r = self.__session.get(url, timeout=30)
+        url = f"{self.api_url}/repos/{full_name}/git/refs/heads/{branch}"
+        r = self._get(url, timeout=30)
         r.raise_for_status()
         return r.json()["object"]["sha"]
 
     def get_tree(self, full_name: str, sha: str) -> List[dict]:
-        url = f"https://api.github.com/repos/{full_name}/git/trees/{sha}?recursive=1"
-        r = self.__session.get(url, timeout=60)
+        return self.get_tree_listing(full_name, sha).get("tree", [])
+
+    def get_tree_listing(self, full_name: str, sha: str) -> dict:
+        # {"sha": <tree sha>, "tree": [...], "truncated": bool}
+        url = f"{self.api_url}/repos/{full_name}/git/trees/{sha}?recursive=1"
+        r = self._get(url, timeout=60)
         r.raise_for_status()
-        return r.json().get("tree", [])
+        return r.json()
 
-    def fetch_raw(self, full_name: str, branch: str, path: str) -> str:
+    def fetch_raw(self, full_name: str, branch: str, path: str, blob_sha: Optional[str] = None) -> str:
         # raw endpoint is faster and avoids extra JSON
-        url = f"https://raw.githubusercontent.com/{full_name}/{quote(branch)}/{path}"
-        r = self.__session.get(url, timeout=60)
+        url = f"{self.raw_url}/{full_name}/{quote(branch)}/{path}"
+        r = self._get(url, timeout=60, blob_sha=blob_sha)
         r.raise_for_status()
         return r.text
 
+    def iter_archive(self, full_name: str, sha: str, max_bytes: int, max_files: int) -> Iterable[Tuple[str, bytes]]:
+        # One request for the whole tree: the tarball is read as a stream and
+        # members are decoded in memory, nothing is extracted to disk
+        url = f"{self.api_url}/repos/{full_name}/tarball/{sha}"
+        with self._send(url, 60, stream=True) as r:
+            r.raise_for_status()
+            files = 0
+            try:
+                with tarfile.open(fileobj=r.raw, mode="r|gz") as tar:
+                    for member in tar:
+                        if not member.isfile() or member.size > max_bytes:
+                            continue
+                        files += 1
+                        if files > max_files:
+                            break
+                        # members live under a "<owner>-<repo>-<short sha>/" prefix
+                        path = member.name.split("/", 1)[-1]
+                        if BINARY_EXT.search(path):
+                            continue
+                        yield path, tar.extractfile(member).read()
+            except (urllib3.exceptions.HTTPError, http.client.HTTPException, EOFError) as e:
+                # r.raw is read directly, so requests does not wrap a broken stream
+                raise requests.exceptions.ConnectionError(f"archive stream broken: {e}", response=r) from e
+
 def find_matches(text: str, patterns: List[re.Pattern]) -> Dict[str, List[str]]:
     findings: Dict[str, List[str]] = {}
     for pat in patterns:
@@ -149,6 +348,110 @@ def find_matches(text: str, patterns: List[re.Pattern]) -> Dict[str, List[str]]:
             findings[pat.pattern] = hits
     return findings
 
+def scan_tree(api: GithubApi, repo: Repository, branch: str, sha: str, scanner: ScanPool,
+              max_bytes: int, max_files: int, prev: Optional[IndexedRepo] = None,
+              pool: Optional[ThreadPoolExecutor] = None) -> IndexedRepo:
+    listing = api.get_tree_listing(repo.name, sha)
+    if prev and prev.tree_sha and prev.tree_sha == listing.get("sha"):
+        return IndexedRepo(repo.name, prev.pushed_at, sha, prev.tree_sha, prev.files)
+    known = prev.by_blob() if prev else {}
+    files = [t for t in listing.get("tree", []) if t.get("type") == "blob" and (t.get("size") or 0) <= max_bytes]
+    files = files[: max_files]
+    todo = [(f.get("path", ""), f.get("sha")) for f in files]
+    todo = [(path, blob) for path, blob in todo if not BINARY_EXT.search(path)]
+
+    def fetch(item):
+        # Runs on a fetch thread: the content goes straight to the scanner
+        # queue, so only the pending scan results pile up here
+        path, blob = item
+        if blob in known:
+            return path, blob, None
+        try:
+            content = api.fetch_raw(repo.name, branch, path, blob)
+        except requests.RequestException:
+            return path, blob, False
+        return path, blob, scanner.submit(content)
+
+    scanned = IndexedRepo(repo.name, None, sha, listing.get("sha"))
+    # map() keeps tree order, so the findings come out in the same order as a serial scan
+    for path, blob, result in (pool.map(fetch, todo) if pool else map(fetch, todo)):
+        if result is None:
+            scanned.files[path] = (blob, known[blob])
+        elif result is False:
+            scanned.failed.append(path)
+        else:
+            scanned.files[path] = (blob, result.get())
+    return scanned
+
+def scan_archive(api: GithubApi, repo: Repository, sha: str, scanner: ScanPool,
+                 max_bytes: int, max_files: int, prev: Optional[IndexedRepo] = None) -> IndexedRepo:
+    # The archive is downloaded whole either way; known blobs only skip matching.
+    # Reading the stream stalls while the scanner queue is full.
+    known = prev.by_blob() if prev else {}
+    pending = {}
+    order = []
+    for path, data in api.iter_archive(repo.name, sha, max_bytes, max_files):
+        blob = git_blob_sha(data)
+        if blob not in known and blob not in pending:
+            pending[blob] = scanner.submit(data)
+        order.append((path, blob))
+    for blob, result in pending.items():
+        known[blob] = result.get()
+    scanned = IndexedRepo(repo.name, None, sha, None)
+    for path, blob in order:
+        scanned.files[path] = (blob, known[blob])
+    return scanned
+
+def resolve_metadata(api: GithubApi, repos: List[Repository], workers: int, batch_size: int = 100) -> int:
+    # Stars, default branch, head SHA and pushed_at over GraphQL, batch_size
+    # repos per request; returns the number of GraphQL requests made
+    batches = [repos[i:i + batch_size] for i in range(0, len(repos), batch_size)]
+
+    def lookup(batch):
+        try:
+            return api.repo_metadata([r.name for r in batch])
+        except (requests.RequestException, ValueError):
+            return {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch, found in zip(batches, pool.map(lookup, batches)):
+            for repo in batch:
+                meta = found.get(repo.name)
+                if meta:
+                    repo.stars = meta["stars"]
+                    repo.default_branch = meta["default_branch"]
+                    repo.head_sha = meta["head_sha"]
+                    repo.pushed_at = meta["pushed_at"]
+    return len(batches)
+
+def scan_repo(api: GithubApi, repo: Repository, scanner: ScanPool, args, prev: Optional[IndexedRepo],
+              pool: Optional[ThreadPoolExecutor] = None) -> IndexedRepo:
+    if repo.head_sha:
+        branch, pushed_at = repo.default_branch, repo.pushed_at
+    else:
+        branch, pushed_at = api.default_branch_and_sha(repo.name)
+    if prev and prev.pushed_at == pushed_at:
+        # nothing was pushed to any branch since the last scan
+        return prev
+    sha = repo.head_sha or api.get_branch_sha(repo.name, branch)
+    if prev and prev.commit_sha == sha:
+        scanned = prev
+    elif args.archive:
+        scanned = scan_archive(api, repo, sha, scanner, args.max_bytes, args.max_files, prev)
+    else:
+        scanned = scan_tree(api, repo, branch, sha, scanner, args.max_bytes, args.max_files, prev, pool)
+    scanned.pushed_at = pushed_at
+    return scanned
+
+def print_matches(repo: Repository, matches: Dict[str, Dict[str, List[str]]]):
+    click.secho(f"\n{repo.name} ({repo.stars}★): {repo.url}", fg="green", bold=True)
+    for path, pats in matches.items():
+        print(f" - {path}")
+        for pat, snippets in pats.items():
+            print(f"   * /{pat}/")
+            for s in snippets[:3]:
+                print(f"     > {s}")
+
 def main():
     parser = ArgumentParser()
     parser.add_argument("-k", "--api-key", required=True, help="GitHub API token. Create one at https://github.com/settings/tokens")
@@ -157,74 +460,113 @@ def main():
     parser.add_argument("--min-stars", type=int, default=500, help="Only include repositories with at least this many stars")
     parser.add_argument("--max-files", type=int, default=2000, help="Maximum files to scan per repository")
     parser.add_argument("--max-bytes", type=int, default=200_000, help="Maximum size of file (bytes) to fetch and scan")
+    parser.add_argument("--cache-dir", default="~/.cache/search_github", help="Directory of the persistent HTTP cache")
+    parser.add_argument("--cache-size", type=int, default=512, help="Maximum size of cached bodies in MB (least recently used are evicted)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the HTTP cache")
+    parser.add_argument("--archive", action="store_true", help="Scan each repository from a single tarball download instead of one raw request per file")
+    parser.add_argument("--incremental", action="store_true", help="Skip repos unchanged since the last scan and rescan only changed files")
+    parser.add_argument("--index", default="~/.cache/search_github/scan-index.sqlite", help="Scan index used by --incremental")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent requests (repositories and files are fetched in parallel)")
+    parser.add_argument("--no-graphql", action="store_true", help="Look up stars, default branch and head SHA with per-repo REST calls")
+    parser.add_argument("--scan-processes", type=int, default=os.cpu_count() or 1, help="Scanner processes (0 scans on the fetch threads)")
+    parser.add_argument("--scan-queue", type=int, default=64, help="Maximum files waiting for or being scanned")
+    parser.add_argument("--api-url", default="https://api.github.com", help="GitHub API base URL (e.g. a local fake_github.py)")
+    parser.add_argument("--raw-url", default="https://raw.githubusercontent.com", help="Raw content base URL")
+    parser.add_argument("--out", help="Write one JSON line per repository to this file as soon as it is done, plus <out>.summary.json")
     args = parser.parse_args(sys.argv[1:])
 
-    api = GithubApi(args.api_key)
-
+    cache = None if args.no_cache else HttpCache(Path(args.cache_dir), args.cache_size * 1024 * 1024)
+    api = GithubApi(args.api_key, cache, workers=args.workers, api_url=args.api_url, raw_url=args.raw_url)
     query = args.query or click.prompt('Enter a search query', type=str, prompt_suffix=">")
+    sink = ResultSink(Path(args.out), query, args.pattern) if args.out else None
+    try:
+        run(api, args, query, sink)
+    finally:
+        if sink is not None:
+            sink.close()
+            click.secho(f"Wrote {sink.path} and {sink.summary_path}", dim=True)
+        click.secho(api.limiter.summary(), dim=True)
+        if cache is not None:
+            click.secho(cache.summary(), dim=True)
+            cache.close()
+
+def repo_record(repo: Repository, **fields) -> dict:
+    return {"repo": repo.name, "url": repo.url, "stars": repo.stars, **fields}
+
+def run(api: GithubApi, args, query: str, sink: Optional[ResultSink] = None):
     click.secho("Running code search...", bold=True)
     repos = api.search(query)
     if not repos:
         click.secho("No results.", fg="red")
         return
 
-    with click.progressbar(repos, label="Fetching star counts") as bar:
-        for repo in repos:
-            bar.update(1)
-            if repo.stars == -1:
-                repo.stars = api.star_count(repo.name)
+    if not args.no_graphql:
+        calls = resolve_metadata(api, list(repos), args.workers)
+        resolved = sum(1 for r in repos if r.head_sha)
+        click.secho(f"Resolved metadata for {resolved}/{len(repos)} repos with {calls} GraphQL requests", dim=True)
+    missing = [r for r in repos if r.stars == -1]
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        with click.progressbar(length=len(missing), label="Fetching star counts") as bar:
+            for repo, stars in zip(missing, pool.map(lambda r: api.star_count(r.name), missing)):
+                repo.stars = stars
+                bar.update(1)
 
+    found = len(repos)
     repos = sorted([r for r in repos if r.stars >= args.min_stars], key=lambda r: r.stars, reverse=True)
     click.secho(f"Repositories matching query (stars >= {args.min_stars}):", bold=True)
     print("\n".join(str(r) for r in repos))
+    if sink:
+        sink.summary["repos_found"] = found
+        sink.summary["repos_selected"] = len(repos)
+        if not args.pattern:
+            for repo in repos:
+                sink.write(repo_record(repo, status="found", results=sorted(repo.result_urls)))
 
     if args.pattern:
-        compiled = [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in args.pattern]
+        matcher = Matcher([re.compile(p, re.IGNORECASE | re.MULTILINE) for p in args.pattern])
         click.secho("\nScanning repositories for provided regex patterns...", bold=True)
-        enriched: List[dict] = []
-        for repo in repos:
-            try:
-                branch, _ = api.default_branch_and_sha(repo.name)
-                sha = api.get_branch_sha(repo.name, branch)
-                tree = api.get_tree(repo.name, sha)
-            except requests.RequestException:
-                continue
-            files = [t for t in tree if t.get("type") == "blob" and (t.get("size") or 0) <= args.max_bytes]
-            files = files[: args.max_files]
-            repo_hits: Dict[str, Dict[str, List[str]]] = {}
-            with click.progressbar(files, label=f"Scanning {repo.name}") as bar:
-                for f in files:
-                    bar.update(1)
-                    path = f.get("path", "")
-                    # quick skip of binaries by extension
-                    if re.search(r"\.(png|jpg|jpeg|gif|pdf|zip|gz|ico|lock|min\.js)$", path, re.I):
-                        continue
-                    try:
-                        content = api.fetch_raw(repo.name, branch, path)
-                    except requests.RequestException:
-                        continue
-                    m = find_matches(content, compiled)
-                    if m:
-                        repo_hits[path] = m
-            if repo_hits:
-                enriched.append({
-                    "repo": repo.name,
-                    "url": repo.url,
-                    "stars": repo.stars,
-                    "matches": repo_hits,
-                })
-        if enriched:
-            click.secho("\nPattern matches:", bold=True)
-            for r in enriched:
-                click.secho(f"\n{r['repo']} ({r['stars']}★): {r['url']}", fg="green", bold=True)
-                for path, pats in r["matches"].items():
-                    print(f" - {path}")
-                    for pat, snippets in pats.items():
-                        print(f"   * /{pat}/")
-                        for s in snippets[:3]:
-                            print(f"     > {s}")
-        else:
+        index = ScanIndex(Path(args.index), args.pattern, args.max_bytes, args.max_files) if args.incremental else None
+        prevs = {r.name: index.get(r.name) for r in repos} if index else {}
+        scanner = ScanPool(matcher, args.scan_processes, args.scan_queue)
+        matched = unchanged = done = 0
+        # Repo tasks wait on file fetches, so the two stages get separate pools;
+        # findings are printed as soon as a repository is finished
+        with ThreadPoolExecutor(max_workers=args.workers) as repo_pool, \
+                ThreadPoolExecutor(max_workers=args.workers) as file_pool:
+            futures = {repo_pool.submit(scan_repo, api, repo, scanner, args, prevs.get(repo.name), file_pool): repo
+                       for repo in repos}
+            for fut in as_completed(futures):
+                repo = futures[fut]
+                done += 1
+                try:
+                    scanned = fut.result()
+                except (requests.RequestException, tarfile.TarError) as e:
+                    click.secho(f"[{done}/{len(futures)}] {repo.name}: failed ({e})", fg="red")
+                    if sink:
+                        sink.write(repo_record(repo, status="failed", error=str(e)))
+                    continue
+                is_unchanged = scanned is prevs.get(repo.name)
+                unchanged += is_unchanged
+                if index:
+                    index.put(scanned)
+                repo_hits = scanned.hits()
+                if sink:
+                    sink.write(repo_record(repo, status="unchanged" if is_unchanged else "scanned",
+                                           commit=scanned.commit_sha, tree=scanned.tree_sha,
+                                           files_scanned=len(scanned.files), files_failed=scanned.failed,
+                                           matches=repo_hits))
+                failed = f", {len(scanned.failed)} failed to fetch" if scanned.failed else ""
+                click.secho(f"[{done}/{len(futures)}] {repo.name}: {len(scanned.files)} files, "
+                            f"{len(repo_hits)} with matches{failed}", fg="yellow" if failed else None, dim=True)
+                if repo_hits:
+                    matched += 1
+                    print_matches(repo, repo_hits)
+        scanner.close()
+        if not matched:
             click.secho("No pattern matches found in scanned repositories.", fg="yellow")
+        if index:
+            click.secho(f"Incremental: {unchanged}/{len(repos)} repos unchanged since the last scan", dim=True)
+            index.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# Test harness run by the attacker container after services are healthy.
+# Sends every payload to /vuln and /safe of every service concurrently,
+# assigns a verdict per case and writes vuln-report.json and report.md once,
+# in matrix order, at the end of the run.
+import argparse
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fuzz_scripts"))
+from httppool import HTTPPool
+from resultstore import ResultStore
+
+BASES = [
+    "php-pdo-emulate:8080",
+    "php-pdo-native:8080",
+    "node-mysql2:3000",
+    "node-knex:3000",
+    "node-sequelize:3000",
+    "python-mysql-connector:5000",
+    "python-sqlalchemy:5000",
+    "python-sqlalchemy-async:5000",
+    "java-jdbc:8080",
+    "java-spring-boot:8080",
+    "ruby-activerecord:4567",
+    "ruby-pg:4567",
+    "go-mysql-native:8080",
+    "go-mysql-emulate:8080",
+    "php-laravel-qb:8080",
+]
+
+PAYLOADS = [
+    "col=name&name=apple",          # benign
+    "col=%00&name=apple",           # null byte
+    "col=?%23%00&name=apple",       # ?#\0 (comment + NUL) — Assetnote-style
+    "col=name?%23%00&name=apple",   # identifier with ?#\0
+    "col=%3F%3B%23%00&name=apple",  # ?;#\0
+    "col=name%60&name=apple",       # stray backtick
+]
+
+BENIGN = "col=name&name=apple"
+ENDPOINTS = ("/vuln", "/safe")
+
+POOL = HTTPPool()
+
+
+def report_key(service: str, endpoint: str, payload: str) -> str:
+    # Same key as run_tests.sh: tr -cd '[:alnum:]_-' | cut -c1-80
+    key = f"{service}_{endpoint.replace('/', '_')}_{payload}"
+    return re.sub(r"[^A-Za-z0-9_-]", "", key)[:80]
+
+
+def has_error(body: str) -> bool:
+    try:
+        data = json.loads(body or "{}")
+    except ValueError:
+        return False
+    return isinstance(data, dict) and "error" in data
+
+
+def assess(endpoint: str, payload: str, http_code: int, body: str) -> str:
+    # /vuln: HTTP >= 400 or an "error" key for a non-benign payload => vulnerable
+    # /safe: 400 (invalid column) => safe_rejected
+    error = has_error(body)
+    if endpoint == "/vuln":
+        if payload != BENIGN and (http_code >= 400 or error):
+            return "vulnerable"
+        return "no_indicator"
+    if http_code == 400:
+        return "safe_rejected"
+    if http_code >= 400 or error:
+        return "error"
+    return "ok"
+
+
+def run_case(case):
+    base, endpoint, payload = case
+    service = base.split(":", 1)[0]
+    print(f"Testing {service} {endpoint} {payload}", file=sys.stderr)
+    try:
+        code, raw = POOL.get(f"http://{base}{endpoint}?{payload}")
+        body = raw.decode(errors="replace")
+    except Exception as e:
+        code, body = 0, ""
+        print(f"{service} {endpoint}: {e}", file=sys.stderr)
+    return {
+        "service": service,
+        "endpoint": endpoint,
+        "payload": payload,
+        "http_code": code,
+        "body": body,
+        "verdict": assess(endpoint, payload, code, body),
+    }
+
+
+def iter_cases(bases, payloads):
+    for base in bases:
+        for endpoint in ENDPOINTS:
+            for payload in payloads:
+                yield base, endpoint, payload
+
+
+def write_reports(results, bases, payloads, out_dir: Path, compat: bool):
+    report_json = out_dir / "vuln-report.json"
+    report_md = out_dir / "report.md"
+
+    entries = {}
+    for r in results:
+        entry = {"http_code": r["http_code"], "body": r["body"] + "\n" if compat else r["body"]}
+        if not compat:
+            entry["verdict"] = r["verdict"]
+        entries[report_key(r["service"], r["endpoint"], r["payload"])] = entry
+    with report_json.open("w", encoding="utf-8") as jf:
+        json.dump(entries, jf, ensure_ascii=False, indent=2)
+        jf.write("\n")
+
+    counts = {}
+    for r in results:
+        per_endpoint = counts.setdefault((r["service"], r["endpoint"]), {})
+        per_endpoint[r["verdict"]] = per_endpoint.get(r["verdict"], 0) + 1
+
+    with report_md.open("w", encoding="utf-8") as md:
+        md.write("# SQLi Test Report\n\n")
+        for r in results:
+            md.write(f"{r['service']} {r['endpoint']} {r['payload']} => {r['verdict']}\n")
+        md.write("## Summary\n\n")
+        for base in bases:
+            service = base.split(":", 1)[0]
+            md.write(f"- {service}:\n")
+            if compat:
+                md.write(f"  - /vuln tested with {len(payloads)} payloads\n")
+                md.write(f"  - /safe tested with {len(payloads)} payloads\n")
+                continue
+            for endpoint in ENDPOINTS:
+                verdicts = ", ".join(f"{v}: {n}" for v, n in sorted(counts.get((service, endpoint), {}).items()))
+                md.write(f"  - {endpoint} tested with {len(payloads)} payloads ({verdicts})\n")
+    return report_json, report_md
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the /vuln and /safe payload matrix against all services")
+    parser.add_argument("--out-dir", default="/workspace/out", help="output directory")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight")
+    parser.add_argument("--compat", action="store_true", help="use the report layout of the old shell harness (no verdicts in vuln-report.json, payload counts only in report.md); bodies are still stored in full")
+    parser.add_argument("--service", action="append", default=[], help="restrict to this service (repeatable)")
+    parser.add_argument("--db", help="SQLite results store shared with the fuzzers (default: OUT_DIR/results.sqlite)")
+    parser.add_argument("--no-db", action="store_true", help="do not record the run in the results store")
+    parser.add_argument("--label", default="", help="name of the run in the results store")
+    args = parser.parse_args()
+
+    bases = [b for b in BASES if not args.service or b.split(":", 1)[0] in args.service]
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    cases = list(iter_cases(bases, PAYLOADS))
+    POOL.pool_size = args.concurrency
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as ex:
+        # map() yields results in submission order, i.e. matrix order
+        results = list(ex.map(run_case, cases))
+
+    report_json, report_md = write_reports(results, bases, PAYLOADS, out_dir, args.compat)
+    print(POOL.summary(), file=sys.stderr)
+    if not args.no_db:
+        store = ResultStore(Path(args.db) if args.db else out_dir / "results.sqlite")
+        store.start_run("run_tests", args.label, {"services": [b.split(":", 1)[0] for b in bases]})
+        for r in results:
+            store.add(r["service"], r["endpoint"], r["payload"], r["http_code"], r["verdict"], r["body"])
+        store.finish_run()
+        print(store.summary(), file=sys.stderr)
+        store.close()
+    print(f"Done. Wrote {report_json} and {report_md}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
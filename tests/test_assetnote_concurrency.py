@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# The asyncio engine of assetnote_fuzzer.py must reach --concurrency requests
+# in flight, independent of the CPU count (the loop's default executor would
+# cap it at min(32, cpus + 4)).
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fuzz_scripts"))
+import assetnote_fuzzer
+from checkpoint import Journal
+
+CONCURRENCY = 40
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.cond = threading.Condition()
+        self.in_flight = 0
+        self.peak = 0
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        srv = self.server
+        with srv.cond:
+            srv.in_flight += 1
+            srv.peak = max(srv.peak, srv.in_flight)
+            srv.cond.notify_all()
+            # Hold every request until the limit is reached (or give up after 2s)
+            srv.cond.wait_for(lambda: srv.peak >= CONCURRENCY, timeout=2)
+        time.sleep(0.01)
+        with srv.cond:
+            srv.in_flight -= 1
+        body = b'{"rows": []}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_run_async_reaches_concurrency(tmp_path):
+    srv = Server()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    port = str(srv.server_address[1])
+    # One service with three endpoints: 54 cases, more than the limit
+    services = [("127.0.0.1", port, ep, "mysql") for ep in ("/a", "/b", "/c")]
+    try:
+        with Journal(tmp_path / "out.ndjson") as journal:
+            asyncio.run(assetnote_fuzzer.run_async(services, journal, CONCURRENCY, CONCURRENCY))
+        lines = (tmp_path / "out.ndjson").read_text(encoding="utf-8").splitlines()
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    assert len(lines) == 3 * len(assetnote_fuzzer.payloads_for("mysql"))
+    assert srv.peak == CONCURRENCY
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# Journal resume after a crash that left a half-written record and a torn
+# journal line: both files go back to the last complete journal entry.
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fuzz_scripts"))
+from checkpoint import Journal, case_id
+
+
+def record(n: int) -> str:
+    return f'{{"case": {n}, "body": "{"x" * 40}"}}\n'
+
+
+def test_resume_after_torn_journal_line(tmp_path):
+    ndjson = tmp_path / "out.ndjson"
+    cids = [case_id("svc", n) for n in range(4)]
+    with Journal(ndjson) as journal:
+        for n in range(3):
+            journal.write(cids[n], record(n))
+    complete = ndjson.read_bytes()
+    ckpt = journal.path.read_bytes()
+    # The crash: record 3 half written, its journal entry cut inside the offset
+    with ndjson.open("ab") as fh:
+        fh.write(record(3).encode()[:20])
+    with journal.path.open("ab") as fh:
+        fh.write(f"{cids[3]} {len(complete)}"[:19].encode())
+
+    with Journal(ndjson, resume=True) as journal:
+        assert journal.done == set(cids[:3])
+        assert ndjson.read_bytes() == complete
+        assert journal.path.read_bytes() == ckpt
+        journal.write(cids[3], record(3))
+
+    with Journal(ndjson, resume=True) as journal:
+        assert journal.done == set(cids)
+    assert ndjson.read_text() == "".join(record(n) for n in range(4))
+
+
+def test_resume_skips_journaled_cases_and_fresh_run_overwrites(tmp_path):
+    ndjson = tmp_path / "out.ndjson"
+    cids = [case_id("svc", "/vuln", n) for n in range(5)]
+    with Journal(ndjson) as journal:
+        for n in range(2):
+            journal.write(cids[n], record(n))
+
+    with Journal(ndjson, resume=True) as journal:
+        todo = [cid for cid in cids if journal.pending(cid)]
+        assert todo == cids[2:] and journal.skipped == 2
+        for n in range(2, 5):
+            journal.write(cids[n], record(n))
+    assert ndjson.read_text() == "".join(record(n) for n in range(5))
+
+    with Journal(ndjson) as journal:
+        assert not journal.done and all(journal.pending(cid) for cid in cids)
+    assert ndjson.read_bytes() == b"" and journal.path.read_bytes() == b""
+    # case IDs are deterministic and depend on every part
+    assert case_id("svc", "/vuln", 0) == cids[0] != case_id("svc", "/vuln", "0 ")
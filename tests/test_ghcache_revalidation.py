@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# A search page revalidated with a 304 that does not repeat the Link header
+# must still paginate: the cache keeps Link with the stored body.
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "search"))
+import fake_github
+import search_github
+from ghcache import HttpCache
+
+
+def test_pagination_continues_after_304_without_link(tmp_path):
+    # 250 results at 100 per page: three pages
+    world = fake_github.World(repos=250, files=1, lines=1, hit_rate=0.0, results_per_repo=1)
+    api_srv, raw_srv = fake_github.serve(world, 0, 0)
+    handler = api_srv.RequestHandlerClass
+    handler.link_on_304 = False
+    cache = HttpCache(tmp_path / "cache")
+    api = search_github.GithubApi("token", cache, api_url=f"http://127.0.0.1:{api_srv.server_address[1]}",
+                                  raw_url=f"http://127.0.0.1:{raw_srv.server_address[1]}")
+    try:
+        first = api.search("q")
+        second = api.search("q")
+        stats = dict(handler.stats)
+    finally:
+        cache.close()
+        for srv in (api_srv, raw_srv):
+            srv.shutdown()
+            srv.server_close()
+
+    assert len(first) == 250
+    assert {r.name for r in second} == {r.name for r in first}
+    # every page of the second search was a revalidated cache hit
+    assert stats["search"] == 6 and stats["304"] == 3
+    assert cache.revalidated == 3
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# matcher.py must report exactly what find_matches() reports: the literal
+# prefilter may only skip patterns that cannot match, and an anchored pattern
+# may only start scanning where its first match could begin.
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "search"))
+from matcher import Matcher, required_literal
+from search_github import find_matches
+
+FLAGS = re.IGNORECASE | re.MULTILINE
+PATTERNS = [
+    r"knex\.raw",
+    r"ORDER BY \$\{",
+    r"(?:query)\(\s*`[^`]*\$\{",
+    r"\.query\(",
+    r"^\s*select\b.*where",
+    r"execute|exec_sql",
+    r"cursor|knex",
+    r"(?<=\.)whereRaw\(",
+    r"strasse",
+    r"Str\w+",
+]
+TEXTS = [
+    "",
+    "db.query(`SELECT * FROM t WHERE id = ${id}`)\nknex.raw(q)\n",
+    "KNEX.RAW(x) and knex.Raw(y); order by ${col}\n  SELECT a FROM b WHERE c\n",
+    "x = 1\ncursor.execute(sql)\nqb.whereRaw(a); whereRaw(b)\n",
+    # Non-ASCII: re folds U+017F (long s) to "s", U+212A (Kelvin) to "k"
+    "STRAſSE, straſse Knex.raw(1) .query( été",
+    "no patterns here at all",
+]
+
+
+def test_required_literal():
+    assert required_literal(re.compile(r"knex\.raw", FLAGS)) == ("knex.raw", True)
+    assert required_literal(re.compile(r"(?:query)\(\s*`", FLAGS)) == ("query(", True)
+    assert required_literal(re.compile(r"^\s*select\b.*where", FLAGS)) == ("select", False)
+    assert required_literal(re.compile(r"(?<=\.)whereRaw\(", FLAGS)) == ("whereRaw(", False)
+    assert required_literal(re.compile(r"cursor|knex", FLAGS)) == ("", False)
+    # sre factors a common prefix out of an alternation
+    assert required_literal(re.compile(r"execute|exec_sql", FLAGS)) == ("exec", True)
+    assert required_literal(re.compile(r"a(b|c)d", FLAGS)) == ("a", True)
+
+
+def test_matches_find_matches():
+    compiled = [re.compile(p, FLAGS) for p in PATTERNS] + [re.compile(r"WHERE \w+ =", re.MULTILINE)]
+    matcher = Matcher(compiled)
+    for text in TEXTS:
+        assert matcher.find(text) == find_matches(text, compiled), text
+
+
+def test_prefilter_skips_absent_literals():
+    matcher = Matcher([r"knex\.raw", r"\.query\(", r"cursor|knex"])
+    assert set(matcher.first_positions("a.QUERY(b)")) == {(".query(", True)}
+    assert matcher.find("a.QUERY(b)") == {r"\.query\(": ["a.QUERY(b)"]}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# minimise.py on pymysql_fuzzer.py output: the outliers of a variant whose
+# usual code is 500 are 200s, and must be minimised rather than skipped; ddmin
+# itself against a fake target.
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote_to_bytes, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fuzz_scripts"))
+import minimise
+
+
+class Handler(BaseHTTPRequestHandler):
+    # A quote anywhere in col is a syntax error, anything else selects no rows
+    def do_GET(self):
+        query = urlsplit(self.path).query
+        col = unquote_to_bytes(query.split("&")[0].partition("=")[2])
+        if b"'" in col:
+            code, data = 500, {"error": "You have an error in your SQL syntax near '''"}
+        else:
+            code, data = 200, {"rows": []}
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def record(hex_seq: str, code: int, data: dict) -> str:
+    return json.dumps({"hex": hex_seq, "variant": "raw", "http_code": code, "body": json.dumps(data)}) + "\n"
+
+
+def test_pymysql_ok_outliers_are_minimised(tmp_path):
+    error = {"error": "You have an error in your SQL syntax near '''"}
+    ndjson = tmp_path / "fuzz-pymysql.ndjson"
+    ndjson.write_text("".join([
+        record("27", 500, error), record("2227", 500, error), record("2722", 500, error),
+        record("414243", 200, {"rows": []}),
+        # recorded with a row the service no longer returns: stale
+        record("4243", 200, {"rows": [["x"]]}),
+    ]))
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        cases = list(minimise.triggering(ndjson, f"127.0.0.1:{srv.server_address[1]}", "/vuln", []))
+        corpus, _, stale = minimise.minimise(cases, 4, 2)
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    assert [tag for _, tag, _, _ in cases] == ["raw_414243", "raw_4243"]
+    assert stale == 1
+    assert len(corpus) == 1
+    assert corpus[0]["signature"] == "200|ok|0" and corpus[0]["length"] == 1
+    assert corpus[0]["sources"] == [{"tag": "raw_414243", "length": 3}]
+
+
+class FakeTarget:
+    # Signature "hit" when every needle is in the candidate; records the batches
+    def __init__(self, *needles):
+        self.needles = needles
+        self.batches = []
+
+    def signatures(self, candidates):
+        self.batches.append(list(candidates))
+        return ["hit" if all(n in c for n in self.needles) else "miss" for c in candidates]
+
+
+def test_ddmin_reduces_to_a_one_minimal_input():
+    # Two separate bytes: neither half keeps both, the complements do
+    target = FakeTarget(b"'", b"\\")
+    assert minimise.ddmin(target, b"abc'defgh\\ijklmnop", "hit") == b"'\\"
+    # A contiguous token survives whole
+    target = FakeTarget(b"UNION")
+    assert minimise.ddmin(target, b"1 UNION SELECT 2 -- x", "hit") == b"UNION"
+    # Each round is one batch; n = 2 sends only the two halves
+    assert all(len(batch) > 1 for batch in target.batches)
+    assert target.batches[0] == [b"1 UNION SEL", b"ECT 2 -- x"]
+
+
+def test_ddmin_keeps_an_input_that_needs_every_byte():
+    target = FakeTarget(b"abcd")
+    assert minimise.ddmin(target, b"abcd", "hit") == b"abcd"
+    assert minimise.ddmin(FakeTarget(b"x"), b"x", "hit") == b"x"
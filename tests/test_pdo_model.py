@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# pdo_model.py: placeholder scanning of PDO's emulated prepares and the
+# verdicts derived from it for php-pdo-emulate's /vuln query.
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fuzz_scripts"))
+import pdo_model
+from pdo_model import BIND, BIND_POS, EOI, ESCAPED_QUESTION, TEXT
+
+
+def test_scan_tokens():
+    query = b"SELECT 'a?' /* ? */ x -- ?\n ?? :name ? a:b"
+    tokens = [(tok, query[start:end]) for tok, start, end in pdo_model.scan(query)]
+    assert [t for t in tokens if t[0] != TEXT] == [
+        (ESCAPED_QUESTION, b"??"), (BIND, b":name"), (BIND_POS, b"?"), (BIND, b":b"), (EOI, b""),
+    ]
+    # strings and comments are single text tokens
+    assert (TEXT, b"'a?'") in tokens and (TEXT, b"/* ? */") in tokens and (TEXT, b"-- ?") in tokens
+
+
+def test_scan_stops_at_nul():
+    query = b"SELECT `?#\0` FROM fruit WHERE name = ?"
+    info = pdo_model.analyze(query)
+    assert info["positional"] == [8] and info["stopped_at"] == 10
+
+
+@pytest.mark.parametrize("enc, verdict, param_error", [
+    ("name", "ok", False),
+    ("%3F%3F", "ok", False),          # ?? is an escaped ?
+    ("%22%3F%22", "ok", False),       # inside a string
+    ("%2F%2A%3F%2A%2F", "ok", False),  # inside a comment
+    ("a%3Ab", "ok", False),           # :b glued to an identifier
+    ("%3F", "count_mismatch", True),
+    ("%3Aname", "mixed", True),
+    ("%3F%23%00", "shifted", False),  # the Assetnote ?#\0 trick
+    ("%2F%2A", "no_placeholder", False),
+    ("%2D%2D", "no_placeholder", False),
+])
+def test_predict(enc, verdict, param_error):
+    p = pdo_model.predict_encoded(enc)
+    assert (p["verdict"], p["param_error"]) == (verdict, param_error)
+    assert p["interesting"] == (verdict != "ok")
+
+
+def test_rank_puts_predicted_changes_first():
+    payloads = [("a_benign", "name"), ("b", "%3F%3F"), ("c", "%3F"), ("d", "%3F%23%00")]
+    assert [tag for tag, _, _ in pdo_model.rank(payloads)] == ["c", "d", "a_benign", "b"]
+    assert [tag for tag, _, _ in pdo_model.rank(payloads, discard=True)] == ["c", "d", "a_benign"]
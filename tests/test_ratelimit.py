@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# The rate-limit scheduler must not spend budget on 304 revalidations (GitHub
+# does not count them) and must back off on a secondary-limit 403 that carries
+# no retry-after.
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "search"))
+import fake_github
+import search_github
+from ghcache import HttpCache
+from ratelimit import RateLimiter
+
+
+def test_304s_past_the_local_budget_do_not_block(tmp_path):
+    world = fake_github.World(repos=15, files=1, lines=1, hit_rate=0.0, results_per_repo=1)
+    api_srv, raw_srv = fake_github.serve(world, 0, 0, core_limit=20, window=15)
+    handler = api_srv.RequestHandlerClass
+    cache = HttpCache(tmp_path / "cache")
+    api = search_github.GithubApi("token", cache, api_url=f"http://127.0.0.1:{api_srv.server_address[1]}",
+                                  raw_url=f"http://127.0.0.1:{raw_srv.server_address[1]}")
+    names = [world.name(i) for i in range(15)]
+    try:
+        for name in names:
+            api.default_branch_and_sha(name)
+        start = time.monotonic()
+        # 45 revalidations: three times the 5 requests left in the window
+        for _ in range(3):
+            for name in names:
+                api.default_branch_and_sha(name)
+        elapsed = time.monotonic() - start
+        stats = dict(handler.stats)
+    finally:
+        cache.close()
+        for srv in (api_srv, raw_srv):
+            srv.shutdown()
+            srv.server_close()
+
+    assert stats["304"] == 45 and "403" not in stats
+    assert elapsed < 5
+    assert "5 remaining" in api.limiter.summary()
+
+
+def test_secondary_limit_403_without_retry_after_backs_off():
+    notes = []
+    limiter = RateLimiter(notify=notes.append)
+    url = "https://api.github.com/repos/a/b"
+    headers = {"x-ratelimit-limit": "5000", "x-ratelimit-remaining": "4000",
+               "x-ratelimit-reset": str(int(time.time()) + 3600)}
+    limiter.acquire(url)
+    assert not limiter.update(url, 403, headers, '{"message": "Resource not accessible by integration"}')
+    limiter.acquire(url)
+    body = '{"message": "You have exceeded a secondary rate limit. Please wait a few minutes before you try again."}'
+    assert limiter.update(url, 403, headers, body)
+    assert notes == ["Rate limit hit on api.github.com. Waiting 60s..."]
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# report.py streams the .json array from NDJSON; the file must be identical to
+# json.dump(records, indent=2) of the same records, also for bodies holding
+# characters str.splitlines() breaks on (U+2028, U+0085).
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fuzz_scripts"))
+from report import AssetnoteSummary, JsonArrayWriter, build_reports
+
+RECORDS = [
+    {"service": "php-pdo-emulate", "endpoint": "/vuln", "tag": "qmark_hash_nul", "encoded_col": "%3F%23%00",
+     "http_code": 500, "indicator": True, "body": "{\"error\": \"SQLSTATE[HY093]\"}\n"},
+    {"service": "node-mysql2", "endpoint": "/vuln", "tag": "benign", "encoded_col": "name",
+     "http_code": 200, "indicator": False, "body": "", "rows": [], "extra": {}},
+    {"service": "python-sqlalchemy", "endpoint": "/vuln-pg", "tag": "utf8", "encoded_col": "%C3%A9",
+     "http_code": 200, "indicator": False, "body": "é \u2028 \x85 \\ \"q\"", "nested": {"a": [1, 2.5, None, {"b": []}]}},
+]
+
+
+def test_streamed_json_matches_json_dump(tmp_path):
+    ndjson = tmp_path / "out.ndjson"
+    ndjson.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in RECORDS), encoding="utf-8")
+    json_path, md_path = tmp_path / "out.json", tmp_path / "out.md"
+    summary = AssetnoteSummary()
+    assert build_reports(ndjson, json_path, md_path, summary) == len(RECORDS)
+    assert json_path.read_text(encoding="utf-8") == json.dumps(RECORDS, ensure_ascii=False, indent=2)
+    assert "## php-pdo-emulate — indicators: 1/1\n- qmark_hash_nul\n" in md_path.read_text(encoding="utf-8")
+
+
+def test_empty_array_matches_json_dump(tmp_path):
+    path = tmp_path / "empty.json"
+    with path.open("w", encoding="utf-8") as fh:
+        JsonArrayWriter(fh).close()
+    assert path.read_text(encoding="utf-8") == json.dumps([], indent=2)
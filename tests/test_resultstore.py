@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# Runs in the results store: standalone shards of one sweep share a run,
+# --resume only attaches to a run with the same label and sweep parameters,
+# and diff --tool skips shard runs that are still missing shards.
+import subprocess
+import sys
+from pathlib import Path
+
+FUZZ = Path(__file__).resolve().parent.parent / "fuzz_scripts"
+sys.path.insert(0, str(FUZZ))
+from resultstore import ResultStore
+
+META = {"base": "svc:5000", "endpoint": "/vuln", "ngram": 2, "byte_range": "00-7F", "batch": 0}
+KEY = ("base", "endpoint", "ngram", "byte_range")
+
+
+def shard_run(db: Path, label: str, shard, resume: bool = False, finish: bool = True, meta=META) -> int:
+    store = ResultStore(db)
+    run_id = store.start_run("pymysql", label, meta, resume, shard, key=KEY)
+    store.add("svc", "/vuln", f"raw_{shard[0]}", 500, "error", "boom")
+    if finish:
+        store.finish_run()
+    store.close()
+    return run_id
+
+
+def finished(db: Path, run_id: int):
+    store = ResultStore(db)
+    row = store.db.execute("SELECT finished_at, cases FROM runs WHERE id = ?", (run_id,)).fetchone()
+    store.close()
+    return row[0] is not None, row[1]
+
+
+def test_shards_share_a_run(tmp_path):
+    db = tmp_path / "results.sqlite"
+    first = shard_run(db, "v1", (0, 2))
+    assert finished(db, first) == (False, 1)
+    assert shard_run(db, "v1", (1, 2)) == first
+    assert finished(db, first) == (True, 2)
+    # a new sweep with the same label: shard 0 is already done in the first one
+    second = shard_run(db, "v1", (0, 2), finish=False)
+    assert second != first
+    # resume attaches to that sweep, not to another label or other parameters
+    assert shard_run(db, "v1", (0, 2), resume=True) == second
+    assert shard_run(db, "other", (1, 2), resume=True) not in (first, second)
+    assert shard_run(db, "v1", (1, 2), resume=True, meta={**META, "ngram": 3}) not in (first, second)
+
+
+def test_diff_tool_skips_unfinished_shard_runs(tmp_path):
+    db = tmp_path / "results.sqlite"
+    first = shard_run(db, "v1", (0, 2))
+    shard_run(db, "v1", (1, 2))
+    store = ResultStore(db)
+    second = store.start_run("pymysql", "v2", META)
+    store.add("svc", "/vuln", "raw_0", 500, "error", "boom")
+    store.add("svc", "/vuln", "raw_1", 500, "error", "boom")
+    store.finish_run()
+    store.close()
+    shard_run(db, "v3", (0, 2))  # half a sweep
+    out = subprocess.run([sys.executable, str(FUZZ / "resultstore.py"), "diff", "--tool", "pymysql", "--db", str(db)],
+                         capture_output=True, text=True)
+    assert out.returncode == 0, out.stdout + out.stderr
+    assert f"Run {first} -> {second}: 0 changed cases" in out.stderr
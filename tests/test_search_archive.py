@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# search_github.py --archive: a tarball stream that breaks off fails only its
+# repository, the search goes on with the others.
+import json
+import sys
+from argparse import Namespace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "search"))
+import fake_github
+import search_github
+
+PATTERNS = [r"knex\.raw"]
+
+
+def test_broken_archive_stream_skips_the_repo(tmp_path):
+    world = fake_github.World(repos=3, files=20, lines=200, hit_rate=0.05, results_per_repo=1)
+    api_srv, raw_srv = fake_github.serve(world, 0, 0)
+    api_srv.RequestHandlerClass.cut_tarball.add(world.name(1))
+    api = search_github.GithubApi("token", None, workers=2,
+                                  api_url=f"http://127.0.0.1:{api_srv.server_address[1]}",
+                                  raw_url=f"http://127.0.0.1:{raw_srv.server_address[1]}")
+    args = Namespace(pattern=PATTERNS, min_stars=0, no_graphql=False, workers=2, incremental=False,
+                     index=str(tmp_path / "index.sqlite"), max_bytes=200_000, max_files=2000,
+                     scan_processes=0, scan_queue=8, archive=True)
+    sink = search_github.ResultSink(tmp_path / "out.ndjson", "q", PATTERNS)
+    try:
+        search_github.run(api, args, "q", sink)
+    finally:
+        sink.close()
+        for srv in (api_srv, raw_srv):
+            srv.shutdown()
+            srv.server_close()
+    records = {r["repo"]: r for r in map(json.loads, (tmp_path / "out.ndjson").read_text().splitlines())
+               if "repo" in r}
+    assert records[world.name(1)]["status"] == "failed"
+    assert {records[world.name(i)]["status"] for i in (0, 2)} == {"scanned"}
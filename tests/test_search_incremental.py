@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# search_github.py --incremental must not record a repo as fully scanned when
+# a raw file could not be fetched: the next run picks the missing file up.
+import json
+import re
+import sys
+from argparse import Namespace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "search"))
+import fake_github
+import search_github
+from scanindex import ScanIndex
+
+REPO = "bench/repo00000"
+FAILING = "src/mod2.js"
+PATTERNS = [r"knex\.raw", r"ORDER BY \$\{"]
+
+
+def scan(api, tmp_path, out):
+    args = Namespace(pattern=PATTERNS, min_stars=0, no_graphql=False, workers=2, incremental=True,
+                     index=str(tmp_path / "index.sqlite"), max_bytes=200_000, max_files=2000,
+                     scan_processes=0, scan_queue=8, archive=False)
+    sink = search_github.ResultSink(tmp_path / out, "q", PATTERNS)
+    search_github.run(api, args, "q", sink)
+    sink.close()
+    return [json.loads(line) for line in (tmp_path / out).read_text(encoding="utf-8").splitlines()]
+
+
+def test_failed_raw_fetch_is_retried_by_next_incremental_run(tmp_path):
+    world = fake_github.World(repos=1, files=5, lines=40, hit_rate=0.2, results_per_repo=1)
+    api_srv, raw_srv = fake_github.serve(world, 0, 0)
+    handler = api_srv.RequestHandlerClass
+    api = search_github.GithubApi("token", None, workers=2,
+                                  api_url=f"http://127.0.0.1:{api_srv.server_address[1]}",
+                                  raw_url=f"http://127.0.0.1:{raw_srv.server_address[1]}")
+    try:
+        handler.fail_raw.add(f"{REPO}/{FAILING}")
+        first = scan(api, tmp_path, "first.ndjson")
+        handler.fail_raw.clear()
+        handler.stats.clear()
+        second = scan(api, tmp_path, "second.ndjson")
+        raw_requests = handler.stats.get("raw", 0)
+        third = scan(api, tmp_path, "third.ndjson")
+    finally:
+        for srv in (api_srv, raw_srv):
+            srv.shutdown()
+            srv.server_close()
+
+    assert first[0]["status"] == "scanned" and first[0]["files_failed"] == [FAILING]
+    assert second[0]["status"] == "scanned" and second[0]["files_failed"] == []
+    assert second[0]["files_scanned"] == 5
+    # Only the file that failed is fetched again
+    assert raw_requests == 1
+    assert third[0]["status"] == "unchanged"
+
+    index = ScanIndex(tmp_path / "index.sqlite", PATTERNS, 200_000, 2000)
+    stored = index.get(REPO)
+    index.close()
+    assert FAILING in stored.files and stored.pushed_at == world.pushed_at(0)
+    expected = search_github.find_matches(world.content(0, FAILING).decode(),
+                                          [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in PATTERNS])
+    assert stored.files[FAILING][1] == expected
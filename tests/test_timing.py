@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# timing.py: the one-sided Mann-Whitney U test, the sample-size rule and the
+# probe loop's stopping decisions, with a fake clock instead of a service.
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fuzz_scripts"))
+import timing
+
+
+def test_mann_whitney_greater():
+    # No ties: U2 = 9, mean 4.5, var 5.25, z = (9 - 4.5 - 0.5) / sqrt(5.25)
+    expected = 0.5 * math.erfc(4 / math.sqrt(5.25) / math.sqrt(2))
+    assert timing.mann_whitney_greater([1, 2, 3], [4, 5, 6]) == pytest.approx(expected)
+    # Ties (three 2s, two 6s): U2 = 26, mean 15, var = 30/12 * (12 - 30/110)
+    expected = 0.5 * math.erfc((26 - 15 - 0.5) / math.sqrt(2.5 * (12 - 30 / 110)) / math.sqrt(2))
+    assert timing.mann_whitney_greater([1, 2, 2, 3, 5], [2, 4, 6, 6, 7, 8]) == pytest.approx(expected)
+    # One-sided: a faster probe is not significant, identical samples give 1
+    assert timing.mann_whitney_greater([4, 5, 6], [1, 2, 3]) > 0.9
+    assert timing.mann_whitney_greater([1, 1, 1], [1, 1, 1]) == 1.0
+
+
+def test_required_samples():
+    noisy = [0.01, 0.02, 0.03, 0.5, 0.9]  # MAD 0.02 despite the outliers
+    assert timing.required_samples([0.01] * 5, 0.5, 5, 30) == 5
+    assert timing.required_samples(noisy, 0.02, 5, 30) == math.ceil(8 * 1.4826 ** 2)
+    assert timing.required_samples(noisy, 0.01, 5, 30) == 30
+    assert timing.required_samples(noisy, 0.0, 5, 30) == 30
+
+
+def fake_fetch(delay: float, jitter):
+    # Around 10 ms, each URL cycling through the jitter sequence; the probe
+    # URL adds delay
+    calls = {"base": 0, "probe": 0}
+
+    def fetch(url):
+        t = 0.010 + jitter[calls[url] % len(jitter)]
+        calls[url] += 1
+        return 200, t + (delay if url == "probe" else 0.0)
+    return fetch, calls
+
+
+def test_probe_stops_early_when_delayed():
+    fetch, calls = fake_fetch(1.0, [0.0, 0.001, 0.002, 0.003])
+    res = timing.probe(fetch, "base", "probe", sleep=1.0, min_samples=5, max_samples=30)
+    assert res["verdict"] == "delayed" and res["samples"] == 5 and calls == {"base": 5, "probe": 5}
+    assert res["p_value"] < 0.01 and res["delta_ms"] == pytest.approx(1000, abs=5)
+
+
+def test_probe_rules_out_a_delay_on_a_quiet_service():
+    fetch, _ = fake_fetch(0.0, [0.0, 0.001])
+    res = timing.probe(fetch, "base", "probe", sleep=1.0, min_samples=5, max_samples=30)
+    assert res["verdict"] == "no_delay" and res["samples"] == 5
+
+
+def test_probe_samples_a_noisy_service_longer():
+    # Jitter spread over 0-100 ms against an effect of 50 ms: MAD 50 ms, so
+    # ceil(8 * (1.4826 * 0.05 / 0.05) ** 2) = 18 samples before ruling it out
+    fetch, _ = fake_fetch(0.0, [0.0, 0.05, 0.1])
+    res = timing.probe(fetch, "base", "probe", sleep=0.1, min_samples=5, max_samples=30)
+    assert res["verdict"] == "no_delay" and res["samples"] == 18
+    # ...but never more than max_samples
+    fetch, _ = fake_fetch(0.0, [0.0, 0.05, 0.1])
+    res = timing.probe(fetch, "base", "probe", sleep=0.1, min_samples=5, max_samples=10)
+    assert res["verdict"] == "no_delay" and res["samples"] == 10
+